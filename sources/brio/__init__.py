@@ -18,14 +18,14 @@ CC0 1.0 Universal for more details.
 Author(s): Vicente Sobrinho <vicente.sobrinho@ufca.edu.br>
 """
 import numpy
-import copy
 import sys
 from random import sample
 from enum import Enum
 
 # Local imports
 from .kdtree import *
-from ..geometry import BoundingBox, Point
+from .hilbert import HilbertCurve
+from ..geometry import BoundingBox, Point, to_coords
 from ..canvas import Canvas
 from ..log import *
 
@@ -33,23 +33,27 @@ from ..log import *
 BRIO_NONE    = 0
 BRIO_RANDOM  = 1
 BRIO_KDTREE  = 2
+BRIO_HILBERT = 3
 
 # Temporarily, we have only implemented NONE and RANDOM.
 class Brio:
   """\
   Constructs a Biased Randomized Insertion Order (BRIO).
 
-  Currently available BRIOS: None and random shuffle.
+  Currently available BRIOS: None, random shuffle, kD-tree and Hilbert curve
+  orders. The last two sort the points of each round independently.
 
   Parameters
   ----------
-    points : random access container (list or numpy.array)
-        Container of 2D points.
+    method : int (default: BRIO_RANDOM)
+        The sorting method (BRIO_NONE, BRIO_RANDOM, BRIO_KDTREE or BRIO_HILBERT).
+    seed : int (default: None)
+        A seed for the random number generator.
 
   Returns
   --------
     P : numpy.array
-        Container of sorted points.
+        A (n,2) float64 array with the sorted point coordinates.
 
   References
   ----------
@@ -57,8 +61,9 @@ class Brio:
       Proceedings of the 19th Annual Symposium on Computational geometry,
       p. 211-219, 2003.
   """
-  def __init__(self, method = BRIO_RANDOM):
+  def __init__(self, method = BRIO_RANDOM, seed = None):
     self.__method = method
+    self.__random = numpy.random.default_rng(seed)
     self.__points = None
     self.__rounds = None
     self.__canvas = None
@@ -67,12 +72,26 @@ class Brio:
     return self.__rounds
 
   def __call__(self, points):
-    # copy input point set
+    # consume the whole stream, so every round gets sorted
+    for _ in self.stream(points):
+      pass
+    
+    return self.__points
+
+  def stream(self, points):
+    """\
+    Yields the BRIO of `points` one round at a time.
+
+    Rounds are (k,2) views into a single array of coordinates, and each one
+    is only sorted when requested, so consumers can start working on the
+    first rounds before the last ones are sorted.
+    """
+    # copy input point set into a contiguous (n,2) array of coordinates
     self.__points = None
-    if isinstance(points, numpy.ndarray):
-      self.__points = copy.deepcopy(points)
-    elif isinstance(points, list):
-      self.__points = numpy.array(points)
+    if isinstance(points, numpy.ndarray) and points.dtype != object:
+      self.__points = points.astype(numpy.float64) # always a fresh copy
+    elif isinstance(points, (list, numpy.ndarray)):
+      self.__points = to_coords(points)
     else:
       error("Input container not supported.")
       sys.exit(1)
@@ -80,12 +99,14 @@ class Brio:
     # set the chosen brio order
     if self.__method == BRIO_RANDOM:
       self.__brio_random()
+      yield self.__points
     elif self.__method == BRIO_KDTREE:
-      self.__brio_kdtree()
+      yield from self.__brio_kdtree()
+    elif self.__method == BRIO_HILBERT:
+      yield from self.__brio_hilbert()
     else:
       assert self.__method == BRIO_NONE
-    
-    return self.__points
+      yield self.__points
   
   def __create_rounds(self):
     """Computes round intervals."""
@@ -93,33 +114,47 @@ class Brio:
     r = int(numpy.floor(numpy.log2(n))) # number of rounds
     sizes = numpy.zeros((r,), dtype=int) # size of each round
     for i in range(r-1, 0, -1):
-      k = sum(random.binomial(1, 0.5, n))
+      # each remaining point joins round i with probability 1/2
+      k = self.__random.binomial(n, 0.5)
       sizes[i] = k
       n = n - k
     sizes[0] = n
 
-    # compute round ranges
-    self.__rounds = numpy.zeros((r,), dtype=tuple)
-    left = 0
-    for i, size in enumerate(sizes):
-      right = left + size
-      self.__rounds[i] = (left,right)
-      left = right
+    # compute round ranges, one [left, right) row per round
+    edges = numpy.zeros(r+1, dtype=numpy.int64)
+    numpy.cumsum(sizes, out=edges[1:])
+    self.__rounds = numpy.empty((r,2), dtype=numpy.int64)
+    self.__rounds[:,0] = edges[:-1]
+    self.__rounds[:,1] = edges[1:]
 
   def __brio_random(self):
-    random.shuffle(self.__points)
+    # a single gather is cheaper than swapping rows one by one
+    order = self.__random.permutation(len(self.__points))
+    self.__points = self.__points[order]
   
   def __brio_kdtree(self):
     # create rounds
     self.__create_rounds()
 
-    for r in self.__rounds:
-      tree = KdTree()
-      if r[1]-r[0] > 1:
-        block = tree.sort(self.__points[r[0]:r[1]])
-        self.__points[r[0]:r[1]] = block[:]
+    # a single tree sorts every round in place, reusing its node table
+    tree = KdTree()
+    tree.reserve((self.__rounds[:,1] - self.__rounds[:,0]).max())
+    for left, right in self.__rounds:
+      if right-left > 1:
+        tree.sort(self.__points[left:right])
+      if right > left:
+        yield self.__points[left:right]
 
-    return self.__points
+  def __brio_hilbert(self):
+    # create rounds
+    self.__create_rounds()
+
+    curve = HilbertCurve()
+    for left, right in self.__rounds:
+      if right-left > 1:
+        self.__points[left:right] = curve.sort(self.__points[left:right])
+      if right > left:
+        yield self.__points[left:right]
   
   def draw(self):
     """Draw circumcircles over the current active canvas."""
@@ -134,12 +169,10 @@ class Brio:
     all_colors = [k for k,v in pltc.cnames.items()]
     colors = sample(all_colors, len(self.__rounds))
 
-    for i, r in enumerate(self.__rounds):
+    for i, (left, right) in enumerate(self.__rounds):
+      curve = self.__points[left:right]
+      segments = numpy.stack([curve[:-1], curve[1:]], axis=1)
       self.__canvas.begin()
-      for j in range(r[0], r[1]-1):
-        p = self.__points[j]
-        q = self.__points[j+1]      
-        self.__canvas.draw_segment(p, q, colors[i])
-      for p in self.__points:
-        self.__canvas.draw_point(p)
+      self.__canvas.draw_segments(segments, colors[i])
+      self.__canvas.draw_points(self.__points)
       self.__canvas.end()
@@ -17,57 +17,65 @@ CC0 1.0 Universal for more details.
 
 Author(s): Vicente Sobrinho <vicente.sobrinho@ufca.edu.br>
 """
-import copy
 import numpy
-from numpy import random
-from queue import Queue
+from collections import deque
 
 # Local imports
-from ..geometry import BoundingBox, Point
+from ..geometry import BoundingBox, Point, to_coords, to_points
 from ..canvas import Canvas
 from ..log import *
 
 X_AXIS = 0
 Y_AXIS = 1
 
+NO_AXIS = -1 # axis of leaf nodes
+NO_NODE = -1 # index of empty children
+
 class Node:
   """\
   Kd-tree node class.
+
+  A node is a lightweight view over a row of the node table of its tree,
+  so it can be created on demand.
   """
-  def __init__(self):
-    self.__axis  = None
-    self.__point = None
-    self.__child = [None, None]
-    self.__bbox  = BoundingBox()
+  def __init__(self, tree, i):
+    self.__tree  = tree
+    self.__index = i
+
+  @property
+  def index(self):
+    return self.__index
   
   @property
   def axis(self):
-    return self.__axis
+    axis = self.__tree.node_axes[self.__index]
+    return None if axis == NO_AXIS else int(axis)
   
   @property
   def point(self):
-    return self.__point
+    return self.__tree.points[self.__tree.node_point_ids[self.__index]]
   
   def child(self, i):
     assert 0 <= i <= 1
-    return self.__child[i]
+    child = self.__tree.node_children[self.__index, i]
+    return None if child == NO_NODE else Node(self.__tree, child)
   
   @property
   def bbox(self):
-    return self.__bbox
+    return BoundingBox(*self.__tree.node_bboxes[self.__index])
 
-  def set_point(self, point):
-    self.__point = copy.copy(point)
+  def set_point(self, i):
+    """Sets the index, into the tree points, of the point stored here."""
+    self.__tree.node_point_ids[self.__index] = i
 
   def set_axis(self, axis):
-    self.__axis = axis
+    self.__tree.node_axes[self.__index] = axis
     
   def set_child(self, i, node):
-    self.__child[i] = node
+    self.__tree.node_children[self.__index, i] = NO_NODE if node is None else node.index
 
   def set_bbox(self, xmin, ymin, xmax, ymax):
-    self.__bbox.set_min(xmin, ymin)
-    self.__bbox.set_max(xmax, ymax)
+    self.__tree.node_bboxes[self.__index] = (xmin, ymin, xmax, ymax)
 
 class KdTree:
   """\
@@ -75,6 +83,9 @@ class KdTree:
 
   This class implements a 2D kD-tree following the design of Liu et al. (2013),
   where points area stored in both internal and external nodes.
+  Points are kept as a contiguous (n,2) float64 array of coordinates, along
+  with the array of their original indices. Nodes are rows of a node table
+  made of parallel arrays, the root being node 0.
 
   References
   ----------
@@ -83,31 +94,57 @@ class KdTree:
       n. 1, p. 99-109, 2013.
   """
   def __init__(self):
-    self.__nodes  = []
-    self.__points = None
+    self.__coords = None # (n,2) float64 array of point coordinates
+    self.__ids    = None # original index of each point in `coords`
     self.__bbox = BoundingBox()
     self.__canvas = None
 
+    # node table
+    self.__number_of_nodes = 0
+    self.__node_axes      = None # (m,) split axis of each node
+    self.__node_point_ids = None # (m,) index of the point stored at each node
+    self.__node_children  = None # (m,2) children of each node
+    self.__node_bboxes    = None # (m,4) box (xmin, ymin, xmax, ymax) of each node
+
   @property
   def root(self):
-    assert len(self.__nodes) > 0
-    return self.__nodes[0]
+    assert self.__number_of_nodes > 0
+    return Node(self, 0)
   
-  @property
   def node(self, i):
-    return self.__nodes[i]
+    return Node(self, i)
     
   @property
   def nodes(self):
-    return self.__nodes
+    return [Node(self, i) for i in range(self.__number_of_nodes)]
+
+  @property
+  def node_axes(self):
+    return self.__node_axes
+
+  @property
+  def node_point_ids(self):
+    return self.__node_point_ids
+
+  @property
+  def node_children(self):
+    return self.__node_children
+
+  @property
+  def node_bboxes(self):
+    return self.__node_bboxes
 
   @property
   def point(self, i):
-    return self.__points[i]
+    return self.__coords[i]
     
   @property
   def points(self):
-    return self.__points
+    return self.__coords
+
+  @property
+  def ids(self):
+    return self.__ids
   
   @property
   def bbox(self):
@@ -115,218 +152,241 @@ class KdTree:
   
   @property
   def number_of_nodes(self):
-    return len(self.__nodes)
+    return self.__number_of_nodes
 
   @property
   def number_of_points(self):
-    return len(self.__points)
+    return len(self.__coords)
   
   def create_node(self):
-    self.__nodes.append(Node())
-    return self.nodes[-1]
+    """Appends a node to the node table and returns its index."""
+    i = self.__number_of_nodes
+    self.__number_of_nodes = i + 1
+    return i
+
+  def reserve(self, m):
+    """\
+    Preallocates the node table for up to `m` points, so the same tree can
+    sort several point sets without allocating new nodes each time.
+    """
+    if self.__node_axes is not None and len(self.__node_axes) >= m:
+      return
+
+    self.__node_axes      = numpy.empty(m, dtype=numpy.int8)
+    self.__node_point_ids = numpy.empty(m, dtype=numpy.int64)
+    self.__node_children  = numpy.empty((m,2), dtype=numpy.int64)
+    self.__node_bboxes    = numpy.empty((m,4))
+
+  def __clear_nodes(self, m):
+    """Empties the node table, making room for `m` nodes."""
+    self.reserve(m)
+    self.__number_of_nodes = 0
+    self.__node_axes[:m] = NO_AXIS
+    self.__node_children[:m] = NO_NODE
 
   def insert(self, points):
-    # Get bounding box for the whole tree
-    self.__points = points
-    self.bbox.fit(points)
+    self.__coords = to_coords(points)
+    self.__ids = numpy.arange(len(self.__coords))
 
-    # set point ids
-    for i, p in enumerate(self.__points):
-      p.set_id(i)
+    # Get bounding box for the whole tree
+    self.bbox.fit(self.__coords)
 
+    # every point is stored in exactly one node
+    self.__clear_nodes(len(self.__coords))
     self.__insert(0, len(points),
       self.bbox.min.x, self.bbox.min.y, self.bbox.max.x, self.bbox.max.y)
 
   def __insert(self, begin, end, xmin, ymin, xmax, ymax):
-    n = end - begin
-    node = None
-    if n == 1: # end of recursion, create leaf node
-      node = self.create_node()
-      node.set_point(self.points[begin])
-      node.set_bbox(xmin, ymin, xmax, ymax)
-      return node
-
-    axis = self.__longest_axis(xmin, ymin, xmax, ymax)
-    k = (n + n%2)/2
-    median = self.__select_median_along_axis(k, axis, begin, end-1)
-    print("Mediana: ", median)
-
-    # Split bounding box
-    left_xmin  = xmin
-    left_ymin  = ymin
-    left_xmax  = xmax
-    left_ymax  = ymax
-    right_xmin = xmin
-    right_ymin = ymin
-    right_xmax = xmax
-    right_ymax = ymax
-
-    if axis == X_AXIS:
-      left_xmax = right_xmin = self.points[median].x
-    else:
-      left_ymax = right_ymin = self.points[median].y
-
-    node = self.create_node()
-    node.set_point(self.points[median])
-    node.set_bbox(xmin, ymin, xmax, ymax)
-    node.set_axis(axis)
-    assert node.axis is not None
-
-    # Constrói de forma recursiva a subárvore esquerda
-    left  = None
-    if begin < median: # check for non-emptyness
-      left  = self.__insert(begin, median, left_xmin, left_ymin, left_xmax, left_ymax)
+    """\
+    Builds the subtree over points in [begin, end) and returns its root.
+
+    The construction is iterative: each stack entry holds a pending subtree
+    (begin, end, xmin, ymin, xmax, ymax, parent, slot), where `slot` is the
+    child position in `parent`. Nodes are created in pre-order.
+    """
+    root = self.__number_of_nodes
+    stack = [(begin, end, xmin, ymin, xmax, ymax, NO_NODE, 0)]
+    while stack:
+      begin, end, xmin, ymin, xmax, ymax, parent, slot = stack.pop()
 
-    right = None
-    if median+1 < end: # check for non-emptyness
-      right = self.__insert(median+1, end, right_xmin, right_ymin, right_xmax, right_ymax)
-
-    node.set_child(0, left)
-    node.set_child(1, right)
-  
-    return node
+      node = self.create_node()
+      self.__node_bboxes[node] = (xmin, ymin, xmax, ymax)
+      if parent != NO_NODE:
+        self.__node_children[parent, slot] = node
+
+      n = end - begin
+      if n == 1: # leaf node
+        self.__node_point_ids[node] = begin
+        continue
+
+      axis = self.__longest_axis(xmin, ymin, xmax, ymax)
+      k = (n + n%2)//2
+      median = self.__select_median_along_axis(k, axis, begin, end)
+
+      # Split bounding box
+      left_xmin  = xmin
+      left_ymin  = ymin
+      left_xmax  = xmax
+      left_ymax  = ymax
+      right_xmin = xmin
+      right_ymin = ymin
+      right_xmax = xmax
+      right_ymax = ymax
+
+      if axis == X_AXIS:
+        left_xmax = right_xmin = self.__coords[median, X_AXIS]
+      else:
+        left_ymax = right_ymin = self.__coords[median, Y_AXIS]
+
+      self.__node_point_ids[node] = median
+      self.__node_axes[node] = axis
+
+      # Push the right subtree first, so the left one is built first
+      if median+1 < end: # check for non-emptyness
+        stack.append((median+1, end, right_xmin, right_ymin, right_xmax, right_ymax, node, 1))
+
+      if begin < median: # check for non-emptyness
+        stack.append((begin, median, left_xmin, left_ymin, left_xmax, left_ymax, node, 0))
+
+    return root
     
   def __longest_axis(self, xmin, ymin, xmax, ymax):
     if (xmax - xmin) > (ymax - ymin):
       return X_AXIS
     else:
       return Y_AXIS
-  
-  def __select_median_along_axis(self, i, axis, left, right):
-
-    if left == right:
-      assert i == 1
-      info("  | >> mediana TRIVIAL em %d" % left)
-      return left
-
-    info("Iniciando seleção do %dº:" % i)
-    info("  | axis: %d" % axis)
-    info("  | [left, right]: [%d, %d]" % (left, right))
-
-    pivot = self.__partition(axis, left, right)
-
-    info("  | pivô definitivo: %d" % pivot)
-
-    k = pivot - left # size of left side
-    if i < k+1:
-      info("  | >> buscando o %dº" % i)
-      info("  | >> no intervalo: [%d,%d]" % (left, pivot-1))
-      return self.__select_median_along_axis(i, axis, left, pivot-1)
-    elif i > k+1:
-      info("  | >> buscando o %dº" % (i-k-1))
-      info("  | >> no intervalo: [%d,%d]" % (pivot+1, right))
-      return self.__select_median_along_axis(i-k-1, axis, pivot+1, right)
-    else: # i == k+1:
-      info("  | >> mediana encontrada em %d" % pivot)
-      return pivot
-  
-  def __partition(self, axis, left, right):
-    """Lomuto partition."""
-    info("  | Particionando...")
-    # Seleciona um pivô aleatório e mova-o para o final, temporariamente
-    index = random.randint(left, right+1)
-    info("  | pivô aleatório inicial: %d" % index)
-    pivot = self.points[index]
-    self.points[index], self.points[right] = self.points[right], self.points[index]
-
-    # Particiona os pontos em torno do pivô
-    i = left - 1
-    for j in range(left, right):
-      if (self.points[j].coords[axis] <= pivot.coords[axis]):
-        i = i + 1
-        self.points[i], self.points[j] = self.points[j], self.points[i]
-
-    # Move o pivô de volta para a posição correta
-    self.points[i+1], self.points[right] = self.points[right], self.points[i+1]
-
-    return i + 1
-  
-  def __sort_inorder_left_first(self, node, buffer):
-    if node is None:
-      return
 
-    self.__sort_inorder_left_first(node.child(0), buffer)
-    buffer.append(node.point)
-    self.__sort_inorder_left_first(node.child(1), buffer)
-
-  def __sort_inorder_right_first(self, node, buffer):
-    if node is None:
-      return
-
-    self.__sort_inorder_right_first(node.child(1), buffer)
-    buffer.append(node.point)
-    self.__sort_inorder_right_first(node.child(0), buffer)
-
-  def __sort_inorder_alternating(self, node, buffer):
-    if node is None:
-      return
-
-    if node.axis == X_AXIS:
-      self.__sort_inorder_left_first(node.child(0), buffer)
-      buffer.append(node.point)
-      aux = []
-      self.__sort_inorder_right_first(node.child(1), aux)
-      buffer.extend(reversed(aux))
-    else:
-      self.__sort_inorder_right_first(node.child(0), buffer)
-      buffer.append(node.point)
-      self.__sort_inorder_left_first(node.child(1), buffer)
-
-  def __sort_inorder_alternating2(self, node, buffer, swap = 0):
-    if node is None:
-      return
-    
-    if swap == 0:
-      self.__sort_inorder_alternating2(node.child(0), buffer, swap)
-      buffer.append(node.point)
-      aux = []
-      self.__sort_inorder_alternating2(node.child(1), aux, swap)
-      buffer.extend(reversed(aux))
-    else:
-      self.__sort_inorder_alternating2(node.child(1), aux, swap)
-      buffer.append(node.point)
-      aux = []
-      self.__sort_inorder_alternating2(node.child(0), aux, swap)
-      buffer.extend(reversed(aux))
-
-  def __sort_inorder(self, node, buffer):
-    if node is None:
-      return
-
-    self.__sort_inorder(node.child(0), buffer)
-    buffer.append(node.point)
-    self.__sort_inorder(node.child(1), buffer)
-
-  def __sort_breadth_first(self, root, buffer):
-    Q = Queue(maxsize = 0) # do we need an infinite size queue?
-    Q.put(root)
-
-    i = 0
-    while not Q.empty():
-      node = Q.get()
-
-      if node.child(0) != None:
-        Q.put(node.child(0))
-
-      if node.child(1) != None:
-        Q.put(node.child(1))
-
-      buffer.append(node.point)
-      i = i + 1
+  def __select_median_along_axis(self, k, axis, begin, end):
+    """\
+    Moves the k-th smallest point along `axis` in [begin, end) to its final
+    position, with smaller points before it and larger ones after it.
+
+    The selection is carried out by `numpy.argpartition` (introselect), so
+    it runs in linear time without any Python-level loop. Its pivots are
+    deterministic medians of three, falling back to median of medians, so
+    sorted inputs do not degrade it to quadratic time.
+    """
+    order = numpy.argpartition(self.__coords[begin:end, axis], k-1, kind='introselect')
+    perm = begin + order
+    self.__coords[begin:end] = self.__coords[perm]
+    self.__ids[begin:end] = self.__ids[perm]
+    return begin + k - 1
+  
+  def __sort_inorder_generic(self, root, out, k, reverse = False, alternate = False):
+    """\
+    Writes the point indices of the subtree rooted at `root` into `out` in
+    in-order, starting at position `k`, and returns the next free position.
+
+    A node flagged as `reverse` visits its right subtree first. Children
+    inherit the flag of their parent, unless `alternate` is set: then the
+    first visited child is never reversed and the second one always is.
+    The traversal is iterative, so it is not bounded by the recursion limit.
+    """
+    if root == NO_NODE:
+      return k
+
+    children = self.__node_children
+    points = self.__node_point_ids
+
+    EXPAND, EMIT = 0, 1
+    stack = [(root, reverse, EXPAND)]
+    while stack:
+      node, rev, action = stack.pop()
+      if action == EMIT:
+        out[k] = points[node]
+        k = k + 1
+        continue
+
+      first, second = children[node]
+      if rev:
+        first, second = second, first
+
+      if alternate:
+        rev_first, rev_second = False, True
+      else:
+        rev_first, rev_second = rev, rev
+
+      # pushed in reverse visiting order
+      if second != NO_NODE:
+        stack.append((second, rev_second, EXPAND))
+      stack.append((node, rev, EMIT))
+      if first != NO_NODE:
+        stack.append((first, rev_first, EXPAND))
+
+    return k
+
+  def __sort_inorder_left_first(self, node, out, k):
+    return self.__sort_inorder_generic(node, out, k)
+
+  def __sort_inorder_right_first(self, node, out, k):
+    return self.__sort_inorder_generic(node, out, k, reverse=True)
+
+  def __sort_inorder_alternating(self, node, out, k):
+    if node == NO_NODE:
+      return k
+
+    # the reverse of a right-first traversal is a left-first one
+    if self.__node_axes[node] == X_AXIS:
+      return self.__sort_inorder_left_first(node, out, k)
+
+    left, right = self.__node_children[node]
+    k = self.__sort_inorder_right_first(left, out, k)
+    out[k] = self.__node_point_ids[node]
+    return self.__sort_inorder_left_first(right, out, k+1)
+
+  def __sort_inorder_alternating2(self, node, out, k):
+    return self.__sort_inorder_generic(node, out, k, alternate=True)
+
+  def __sort_inorder(self, node, out, k):
+    return self.__sort_inorder_generic(node, out, k)
+
+  def __sort_breadth_first(self, root, out, k):
+    Q = deque([root])
+    while Q:
+      node = Q.popleft()
+      left, right = self.__node_children[node]
+
+      if left != NO_NODE:
+        Q.append(left)
+
+      if right != NO_NODE:
+        Q.append(right)
+
+      out[k] = self.__node_point_ids[node]
+      k = k + 1
+
+    return k
 
   def sort(self, points):
+    """\
+    Returns `points` sorted along the kD-tree.
+
+    The result is always a C-contiguous (n,2) float64 array of coordinates,
+    never an array of `Point` objects, so it can be handed as is to
+    vectorized or compiled geometric kernels. A contiguous (n,2) float64
+    array is sorted in place.
+    """
     # Build the kD-tree
     self.insert(points)
 
     # Calling sort algorithm
-    buffer = []
-    #self.__sort_breadth_first(self.root, buffer)
-    #self.__sort_inorder(self.root, buffer)
-    #self.__sort_inorder_alternating(self.root, buffer)
-    self.__sort_inorder_alternating2(self.root, buffer)
-    self.__points = numpy.array(buffer)
-
-    return self.__points
+    root = 0
+    order = numpy.empty(len(self.__coords), dtype=numpy.int64)
+    #self.__sort_breadth_first(root, order, 0)
+    #self.__sort_inorder(root, order, 0)
+    #self.__sort_inorder_alternating(root, order, 0)
+    self.__sort_inorder_alternating2(root, order, 0)
+    self.__coords[:] = self.__coords[order]
+    self.__ids = self.__ids[order]
+
+    # nodes must keep referring to the same points
+    rank = numpy.empty_like(order)
+    rank[order] = numpy.arange(len(order))
+    m = self.__number_of_nodes
+    self.__node_point_ids[:m] = rank[self.__node_point_ids[:m]]
+
+    assert self.__coords.flags.c_contiguous
+    return self.__coords
   
   def is_leaf(self, node):
     if node.child(0) is None:
@@ -338,33 +398,22 @@ class KdTree:
   def draw(self):
     """Draw circumcircles over the current active canvas."""
     if self.__canvas is None:
-      bbox = copy.deepcopy(self.__bbox)
-      bbox.scale(1.25)
+      bbox = self.__bbox.scaled(1.25)
       self.__canvas = Canvas(bbox)
 
-    rectangles = []
-    for node in self.nodes:
-      rectangles.append(node.bbox)
-
     self.__canvas.begin()
-    self.__canvas.draw_rectangle(rectangles)
-    for p in self.points:
-      self.__canvas.draw_point(p)
+    self.__canvas.draw_rectangle(self.__node_bboxes[:self.__number_of_nodes])
+    self.__canvas.draw_points(self.points)
       
     # SORTING CURVE
-    for i in range(len(self.points)-1):
-      p = self.points[i]
-      q = self.points[i+1]      
-      self.__canvas.draw_segment(p, q)
+    segments = numpy.stack([self.points[:-1], self.points[1:]], axis=1)
+    self.__canvas.draw_segments(segments)
     self.__canvas.end()
 
   def statistics(self):
     # squared walk length
-    sqlen = 0.0
-    for i in range(len(self.points)-1):
-      p = self.points[i]
-      q = self.points[i+1]
-      sqlen = sqlen + (q.x - p.x)**2 + (q.y - p.y)**2
+    d = numpy.diff(self.points, axis=0)
+    sqlen = float((d*d).sum())
 
     print("Squared walk length:", sqlen)
 
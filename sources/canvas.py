@@ -17,14 +17,35 @@ CC0 1.0 Universal for more details.
 
 Author(s): Vicente Sobrinho <vicente.sobrinho@ufca.edu.br>
 """
-import matplotlib.pyplot as plt
-from matplotlib.collections import PatchCollection
-from matplotlib.patches import Circle, Rectangle
-import seaborn as sns
-sns.set_theme(style="darkgrid")
+import numpy
+
+# Local imports
+from .geometry import to_coords
+
+# matplotlib and seaborn are slow to import, so they are only loaded
+# when the first canvas is created
+plt = None
+LineCollection = PatchCollection = PolyCollection = EllipseCollection = None
+Circle = Rectangle = None
+
+def _import_matplotlib():
+  """Imports matplotlib and sets the plotting theme, once."""
+  global plt, LineCollection, PatchCollection, PolyCollection, EllipseCollection
+  global Circle, Rectangle
+  if plt is not None:
+    return
+
+  import matplotlib.pyplot
+  from matplotlib.collections import LineCollection, PatchCollection, PolyCollection
+  from matplotlib.collections import EllipseCollection
+  from matplotlib.patches import Circle, Rectangle
+  import seaborn as sns
+  sns.set_theme(style="darkgrid")
+  plt = matplotlib.pyplot
 
 class Canvas:
   def __init__(self, bbox):
+    _import_matplotlib()
     self.__figure, self.__axes = plt.subplots()
     plt.gca().set_aspect('equal')
 
@@ -60,15 +81,36 @@ class Canvas:
     ax = plt.gca()
     ax.add_collection(collection)
 
+  def draw_circles(self, centers, radii):
+    """Draws a (m,2) array of circle centers and their radii as a single artist."""
+    ax = plt.gca()
+    diameters = 2*numpy.asarray(radii)
+    collection = EllipseCollection(diameters, diameters, 0.0, units='xy',
+                                   offsets=numpy.asarray(centers),
+                                   offset_transform=ax.transData,
+                                   edgecolors='magenta', facecolors='none', linewidths=2)
+    ax.add_collection(collection)
+
   def draw_label(self, label, p):
     plt.annotate(label, xy=p.coords)
   
   def draw_point(self, p):
     plt.plot(p.x, p.y, 'r.')
 
+  def draw_points(self, points):
+    """Draws a point set as a single artist."""
+    coords = to_coords(points)
+    plt.plot(coords[:,0], coords[:,1], 'r.')
+
   def draw_segment(self, p, q, style='r-'):
     plt.plot([p.x, q.x], [p.y, q.y], style, linewidth=2, zorder=1)
 
+  def draw_segments(self, segments, color='r'):
+    """Draws a (m,2,2) array of segment endpoints as a single artist."""
+    collection = LineCollection(numpy.asarray(segments), colors=color, linewidths=2, zorder=1)
+    ax = plt.gca()
+    ax.add_collection(collection)
+
   def draw_triangle(self, p, q, r, filled=False):
     x = [p.x, q.x, r.x]
     y = [p.y, q.y, r.y]
@@ -78,13 +120,22 @@ class Canvas:
     else:
       plt.fill(x, y, 'b', facecolor='none', edgecolor='blue', linewidth=1.5, zorder=2)
 
+  def draw_triangles(self, triangles, filled=False):
+    """Draws a (m,3,2) array of triangle vertices as a single artist."""
+    if filled:
+      collection = PolyCollection(triangles, facecolors='magenta', edgecolors='none', alpha=0.2, zorder=1)
+    else:
+      collection = PolyCollection(triangles, facecolors='none', edgecolors='blue', linewidths=1.5, zorder=2)
+    ax = plt.gca()
+    ax.add_collection(collection)
+
   def draw_rectangle(self, rectangles):
-    patches = []
-    for r in rectangles:
-      width  = r.max.x - r.min.x
-      height = r.max.y - r.min.y
-      r = Rectangle(r.min.coords, width, height)
-      patches.append(r)
+    """Draws a (m,4) array of (xmin, ymin, xmax, ymax) rectangles."""
+    rectangles = numpy.asarray(rectangles)
+    x, y = rectangles[:,0], rectangles[:,1]
+    width  = rectangles[:,2] - x
+    height = rectangles[:,3] - y
+    patches = [Rectangle((x0, y0), w, h) for x0, y0, w, h in zip(x, y, width, height)]
 
     collection = PatchCollection(patches, edgecolor='magenta', facecolor='none', linewidth=2)
     ax = plt.gca()
@@ -19,17 +19,52 @@ CC0 1.0 Universal for more details.
 Author(s): Vicente Sobrinho <vicente.sobrinho@ufca.edu.br>
 """
 import numpy
-from numpy import random
-import copy
-from queue import Queue
+import random
 
 # Local imports
-from .brio import Brio, BRIO_NONE, BRIO_RANDOM, BRIO_KDTREE
+from .brio import Brio, BRIO_NONE, BRIO_RANDOM, BRIO_KDTREE, BRIO_HILBERT
 from .canvas import Canvas
-from .geometry import Point, Circle, BoundingBox
-from .geometry import orientation, in_between, circumcircle
+from .geometry import Point, PointView, BoundingBox
+from .geometry import orientations, orient2d, orient2d_triangle, incircle2d, incircles, in_between
+from .geometry import circumcircles
 from .log import *
-from .utils import cw, ccw
+from .utils import CW, CCW
+
+# Relative tolerance of the cached circumcircle tests, and smallest shape
+# ratio of a face for its cached circumcircle to be trusted
+CIRCLE_TOLERANCE = 1e-9
+CIRCLE_SHAPE = 1e-4
+
+# Walking actions, as a function of the base-3 mask classifying the position
+# of a point with relation to a face (see __find_first_conflict)
+UNDEFINED          = -1
+WALK_TO_V0         = 0 # walk to v0 opposite face
+WALK_TO_V1         = 1 # walk to v1 opposite face
+WALK_TO_V2         = 2 # walk to v2 opposite face
+WALK_TO_V0_OR_V1   = 3 # walk to v0 or v1 opposite face
+WALK_TO_V1_OR_V2   = 4 # walk to v1 or v2 opposite face
+WALK_TO_V2_OR_V0   = 5 # walk to v2 or v0 opposite face
+FOUND              = 6 # found, after rotating the face
+
+WALK_ACTION   = [UNDEFINED]*27 # 0 | 1 | 3 | 4 | 9 | 10 | 12 | 13 remain undefined
+WALK_ROTATION = [None]*27 # face rotation, as a permutation of (0,1,2), when found
+WALK_CHOICE   = [None]*(FOUND + 1) # pair of opposite faces, when walking at random
+for mask in [11, 20, 19]: WALK_ACTION[mask] = WALK_TO_V0
+for mask in [5, 7, 8]:    WALK_ACTION[mask] = WALK_TO_V1
+for mask in [15, 21, 24]: WALK_ACTION[mask] = WALK_TO_V2
+WALK_ACTION[2]  = WALK_TO_V0_OR_V1
+WALK_ACTION[6]  = WALK_TO_V1_OR_V2
+WALK_ACTION[18] = WALK_TO_V2_OR_V0
+WALK_CHOICE[WALK_TO_V0_OR_V1] = (0, 1)
+WALK_CHOICE[WALK_TO_V1_OR_V2] = (1, 2)
+WALK_CHOICE[WALK_TO_V2_OR_V0] = (2, 0)
+for mask, rotation in [(16, 0), (22, 1), (14, 2), # at vertex v0, v1, v2
+                       (25, 0), (23, 1), (17, 2), # at edge (v0,v1), (v1,v2), (v2,v0)
+                       (26, 0)]:                  # inside face (v0,v1,v2)
+  WALK_ACTION[mask] = FOUND
+  if rotation != 0:
+    WALK_ROTATION[mask] = (rotation, (rotation+1)%3, (rotation+2)%3)
+del mask, rotation
 
 class DelaunayTriangulation:
   """\
@@ -37,7 +72,8 @@ class DelaunayTriangulation:
 
   This class contains an implementation of the Bowyer-Watson algorithm
   con BRIO for triangulating planar point sets. It closely follows CGAL's
-  Delaunay_triangulation_3 design.
+  Delaunay_triangulation_3 design. Predicates read point coordinates from a
+  contiguous (n,2) array indexed by vertex, rather than from `tds` vertices.
 
   Parameters
   ----------
@@ -45,11 +81,13 @@ class DelaunayTriangulation:
           An implementation of a triangulation data structure providing at
           least the following methods:
             - vertex(i: int): returns the i-th vertex of `tds`.
-            - neighbor(i: int, f: list): returns the i-th neighbor of face `f`.
+            - neighbor(i: int, f: tuple): returns the i-th neighbor of face `f`.
             - incident_faces(i: int): returns all incident faces to vertex `i`.
             - create_vertex(): create a new vertex in `tds`.
             - insert_face(v0: int, v1: int, v2: int):  insert face (v0,v1,v2) into `tds`.
             - remove_face(v0: int, v1: int, v2: int): remove face (v0,v1,v2) from `tds`.
+            - refill(faces: list, edges: list): replace `faces` by the star of a
+              new vertex over the boundary `edges`, returning the new vertex.
             - is_infinite(v0: int, v1: int, v2: int): check if face (v0,v1,v2) is infinite.
 
   Examples
@@ -66,6 +104,16 @@ class DelaunayTriangulation:
     self.__tds = tds() # triangulation data structure
     self.__bbox = BoundingBox() # triangulation bounding box
     self.__canvas = None # used when drawing
+    self.__random = random.Random() # breaks ties when walking
+    self.__points = numpy.full((1,2), numpy.inf) # points cache, by vertex
+    self.__xy = [(numpy.inf, numpy.inf)] # same cache, as float pairs for scalar predicates
+    self.__circles = {} # circumcircles cache, by sorted finite face
+    self.__conflict = [] # conflict set buffer, reused by every insertion
+    self.__cavity = [] # cavity buffer, reused by every insertion
+    self.__conflict_keys = set() # sorted conflict faces, reused by every insertion
+    self.__rejected_keys = set() # sorted faces tested out of conflict, idem
+    self.__grid = None # latest face created in each cell, see __create_grid
+    self.__grid_frame = None # (cells per side, xmin, ymin, x scale, y scale)
 
   # ACCESS methods
 
@@ -92,15 +140,6 @@ class DelaunayTriangulation:
     """Returns True, if any vertex in {v0,v1,v2} is infinite. Otherwise, returns False."""
     return self.__tds.is_infinite(v0, v1, v2)
 
-  def __all_infinite(self, faces):
-    """Returns True, if all face in `faces` is infinite. Otherwise, returns False."""
-    n = 0
-    for f in faces:
-      if self.__is_infinite(f[0], f[1], f[2]):
-        n = n + 1
-
-    return n == len(faces)
-
   # UPDATE methods
 
   def __create_vertex(self):
@@ -115,6 +154,57 @@ class DelaunayTriangulation:
     """Remove face `(v0, v1, v2)` from the triangulation data structure."""
     self.__tds.remove_face(v0, v1, v2)
 
+  def __reserve(self, n):
+    """Grows the points cache so as to hold at least `n` vertices."""
+    if len(self.__points) < n:
+      # at least double it, so repeated insertions grow it amortized
+      n = max(n, 2*len(self.__points))
+      points = numpy.full((n,2), numpy.inf)
+      points[:len(self.__points)] = self.__points
+      self.__points = points
+
+  def __cache_circumcircle(self, v0, v1, v2):
+    """\
+    Caches the circumcircle (cx, cy, r^2) of the finite face (v0,v1,v2).
+
+    Badly shaped faces, whose circumcenter cannot be computed accurately,
+    get `None` instead, so they are always tested exactly.
+    """
+    xy = self.__xy
+    px, py = xy[v0]
+    qx, qy = xy[v1]
+    rx, ry = xy[v2]
+
+    x_rp = px - rx
+    y_rp = py - ry
+    x_rq = qx - rx
+    y_rq = qy - ry
+
+    d_rp = x_rp*x_rp + y_rp*y_rp
+    d_rq = x_rq*x_rq + y_rq*y_rq
+    det = x_rp*y_rq - x_rq*y_rp
+
+    circle = None
+    if abs(det) > CIRCLE_SHAPE*max(d_rp, d_rq):
+      den = 0.5 / det
+      dx = (d_rp*y_rq - d_rq*y_rp)*den
+      dy = (x_rp*d_rq - x_rq*d_rp)*den
+      circle = (rx + dx, ry + dy, dx*dx + dy*dy)
+
+    self.__circles[tuple(sorted((v0, v1, v2)))] = circle
+
+  def __set_point(self, i, p):
+    """Sets the coordinates `p` of the i-th vertex."""
+    x = float(p[0])
+    y = float(p[1])
+    self.__points[i] = x, y
+    if i >= len(self.__xy):
+      self.__xy.extend([(numpy.inf, numpy.inf)]*(i + 1 - len(self.__xy)))
+    self.__xy[i] = (x, y)
+    # vertices are never moved, so the view stays valid even after the cache
+    # is reallocated by `__reserve` (it then keeps the former array alive)
+    self.vertex(i).set_point(PointView(self.__points, i))
+
   # Bowyer-Watson algoritm con BRIO
   def insert(self, points):
     """\
@@ -140,9 +230,9 @@ class DelaunayTriangulation:
     assert len(points) >= 3
 
     info('Creating BRIO...')
-    brio = Brio(BRIO_KDTREE)
-    points = brio(points)
-    info('BRIO done.')
+    brio = Brio(BRIO_HILBERT)
+    rounds = brio.stream(points) # (k,2) arrays of coordinates, sorted lazily
+    self.__reserve(self.number_of_vertices + len(points))
 
     # reshaping bounding box
     debug("Updating bounding box.")
@@ -151,30 +241,89 @@ class DelaunayTriangulation:
     else:
       self.__bbox.expand(points)
 
+    # gather the first rounds, until they hold three non-collinear points
+    head = next(rounds)
+    while len(head) < 3 or self.__find_first_three(head) is None:
+      chunk = next(rounds, None)
+      assert chunk is not None, "All points are collinear."
+      head = numpy.concatenate((head, chunk))
+
     info('Inserting first three points...')
-    self.__insert_first_three(points)
+    self.__insert_first_three(head)
     info('First three insertion done.')
 
+    self.__create_grid(len(points))
+
     info('Inserting remaining points...')
-    hint = [1, 2, 3] # first finite face
-    for p in points[3:]:
-      debug("+-- Inserting point: " + str(p.coords))
+    hint = (1, 2, 3) # first finite face
+    for p in head[3:].tolist():
+      hint = self.__insert_point(p, hint)
 
+    # remaining rounds are sorted as they are reached
+    for chunk in rounds:
+      for p in chunk.tolist(): # float pairs are cheaper than array rows
+        hint = self.__insert_point(p, hint)
+
+    info('Insertion done.')
+
+  def __insert_point(self, p, hint):
+    """\
+    Inserts point `p` and returns the next walk hint.
+
+    The walk starts at the latest face created in the grid cell of `p`, if
+    it still exists, or at face `hint` otherwise.
+    """
+    # this runs once per point, so logging is skipped with a single test
+    if DEBUG_ENABLED:
+      debug("+-- Inserting point: %s", p)
       debug("+-- Finding conflict set and cavity.")
-      conflict, cavity = self.__find_conflict(p, hint)
-      debug("    |-- conflict set: " + str(conflict))
-      debug("    |-- cavity: " + str(cavity))
 
-      debug("    |-- removing conflict set.")
-      self.__remove_conflict(conflict)
+    cell = self.__grid_cell(p)
+    latest = self.__grid[cell]
+    if latest is not None and latest[1] in self.__circles: # still alive
+      hint = latest[0]
 
-      debug("    |-- filling cavity.")
-      self.__fill_cavity(p, cavity)
+    conflict, cavity = self.__find_conflict(p, hint)
+
+    if DEBUG_ENABLED:
+      debug("    |-- conflict set: %s", conflict)
+      debug("    |-- cavity: %s", cavity)
+      debug("    |-- replacing conflict set by cavity faces.")
+
+    hint = self.__update_cavity(p, conflict, cavity)
 
+    if DEBUG_ENABLED:
       debug("    |-- updating walk hint face.")
-      hint = self.__get_walk_hint()
 
-    info('Insertion done.')
+    if hint[1] != 0 and hint[2] != 0:
+      self.__grid[cell] = (hint, (min(hint[1], hint[2]), max(hint[1], hint[2]), hint[0]))
+
+    return hint
+
+  def __create_grid(self, n):
+    """\
+    Creates a uniform grid of about n/16 cells over the bounding box.
+
+    Each cell keeps the latest finite face created around a point inserted
+    into it, as a pair (face, sorted face), so later points falling into that
+    cell start walking nearby. Faces are checked against the circumcircles
+    cache before use, since they may have been removed in the meantime.
+    """
+    k = max(1, int(numpy.sqrt(n/16)))
+    xmin = self.__bbox.min.x
+    ymin = self.__bbox.min.y
+    dx = self.__bbox.max.x - xmin
+    dy = self.__bbox.max.y - ymin
+
+    self.__grid = [None]*(k*k)
+    self.__grid_frame = (k, xmin, ymin, k/dx if dx > 0 else 0.0, k/dy if dy > 0 else 0.0)
+
+  def __grid_cell(self, p):
+    """Returns the index of the grid cell containing point `p`."""
+    k, xmin, ymin, sx, sy = self.__grid_frame
+    i = min(int((p[0] - xmin)*sx), k - 1)
+    j = min(int((p[1] - ymin)*sy), k - 1)
+    return j*k + i
 
   def visual_insert(self, points, with_labels=False):
     """\
@@ -208,15 +357,15 @@ class DelaunayTriangulation:
 
     if self.__canvas is None:
       info("Creating canvas...")
-      bbox = copy.deepcopy(self.__bbox)
-      bbox.scale(1.25)
+      bbox = self.__bbox.scaled(1.25)
       self.__canvas = Canvas(bbox)
       info("Canvas ready.")
 
     info('Creating BRIO...')
-    brio = Brio(BRIO_KDTREE)
-    points = brio(points)
+    brio = Brio(BRIO_HILBERT)
+    points = brio(points) # (n,2) array of coordinates
     info('BRIO done.')
+    self.__reserve(self.number_of_vertices + len(points))
 
     info('Inserting first three points...')
     self.__insert_first_three(points)
@@ -228,43 +377,30 @@ class DelaunayTriangulation:
     self.__canvas.end()
 
     info('Inserting remaining points...')
-    hint = [1, 2, 3] # first hint face
+    hint = (1, 2, 3) # first hint face
     for p in points[3:]:
-      info("+-- Inserting point: " + str(p.coords))
-      self.__canvas.begin()
-      self.__canvas.draw_point(p)
-      self.__canvas.end()
-      
+      info("+-- Inserting point: %s", p)
       info("+-- Finding conflict set and cavity.")
       conflict, cavity = self.__find_conflict(p, hint)
-      info("    |-- conflict set: " + str(conflict))
-      info("    |-- cavity: " + str(cavity))
+      info("    |-- conflict set: %s", conflict)
+      info("    |-- cavity: %s", cavity)
 
-      info("+-- Drawing conflict set and cavity.")
+      # a single canvas pass per insertion: the conflict set and its cavity
+      # are drawn before the update, the updated triangulation on top of them
+      self.__canvas.clear()
       self.__canvas.begin()
+      self.__canvas.draw_point(Point(p[0], p[1]))
       self.draw_conflict(conflict)
       self.draw_cavity(cavity)
       self.draw_circumcircles(conflict)
-      self.__canvas.end()
 
       info("    |-- removing conflict set.")
       self.__remove_conflict(conflict)
 
-      if not self.__all_infinite(conflict):
-        self.__canvas.clear()
-        self.__canvas.begin()
-        self.__canvas.draw_point(p)
-        self.draw_conflict(conflict)
-        self.draw_cavity(cavity)
-        self.__draw(with_labels)
-        self.__canvas.end()
-
       info("    |-- filling cavity.")
       self.__fill_cavity(p, cavity)
 
       info('+-- Drawing updated triangulation...')
-      self.__canvas.clear()
-      self.__canvas.begin()
       self.__draw(with_labels)
       self.__canvas.end()
 
@@ -275,40 +411,37 @@ class DelaunayTriangulation:
 
   # BOWYER-WATSON internal methods
   
+  def __find_first_three(self, points):
+    """\
+    Finds the first point not collinear with the first two ones.
+
+    Returns (i0, i1, i2) such that (points[i0], points[i1], points[i2]) has
+    positive orientation, or None if all points are collinear.
+    """
+    signs = orientations(points[0], points[1], points[2:])
+    nonzero = numpy.flatnonzero(signs)
+    if len(nonzero) == 0:
+      return None
+
+    i = int(nonzero[0]) + 2
+    return (0, 1, i) if signs[i - 2] > 0 else (1, 0, i)
+
   def __insert_first_three(self, points):
     """Insert first three non-collinear points, if any."""
+    first = self.__find_first_three(points)
+    assert first is not None
+
     self.__create_vertex()
     self.__create_vertex()
     self.__create_vertex()
 
-    p0 = points[0]
-    p1 = points[1]
-    # find p3 such that (p1,p2,p3) has positive orientation
-    i = 2
-    found = False
-    while i < points.size:
-      p2 = points[i]
-      if orientation(p0, p1, p2) > 0:
-        found = True
-        break
-      i = i + 1
-
-    if not found:
-      p0 = points[1]
-      p1 = points[0]
-      # find p3 such that (p1,p2,p3) has positive orientation
-      i = 2
-      while i < points.size:
-        p2 = points[i]
-        if orientation(p0, p1, p2) > 0:
-          found = True
-          break
-        i = i + 1
-
-    assert found == True
-
+    i0, i1, i = first
     if i != 2: # the third point is not at the third position, so fix it
-      points[2], points[i] = points[i], points[2]
+      points[[2, i]] = points[[i, 2]]
+
+    p0 = points[i0]
+    p1 = points[i1]
+    p2 = points[2]
 
     # add faces (finite and infinite)
     self.__insert_face(1,2,3)
@@ -317,9 +450,10 @@ class DelaunayTriangulation:
     self.__insert_face(0,1,3)
 
     # set points
-    self.vertex(1).set_point(p0)
-    self.vertex(2).set_point(p1)
-    self.vertex(3).set_point(p2)
+    self.__set_point(1, p0)
+    self.__set_point(2, p1)
+    self.__set_point(3, p2)
+    self.__cache_circumcircle(1,2,3)
 
   def __find_conflict(self, p, hint):
     """Find conflict set and cavity for point `p`."""
@@ -327,22 +461,19 @@ class DelaunayTriangulation:
     conflict, cavity = self.__find_more_conflicts(p, first)
     return conflict, cavity
 
-  def __in_conflict(self, p: Point, v0: int, v1: int, v2: int):
+  def __in_conflict(self, p, v0: int, v1: int, v2: int):
     """Check if point `p` is in conflict with face (v0,v1,v2)."""
-    if self.__is_infinite(v0, v1, v2):
-      # sort vertices to get (v0, v1, v2 = 0), i.e., infinite at last
-      face = [v0,v1,v2]
-      i  = face.index(0)
-      v0 = face[ccw(i)]
-      v1 = face[cw(i)]
-
-      v0 = self.vertex(v0)
-      v1 = self.vertex(v1)
-
-      p0 = v0.point
-      p1 = v1.point
+    if v0 == 0 or v1 == 0 or v2 == 0: # infinite vertex is always at position 0
+      # rotate vertices to get (v0, v1, v2 = 0), i.e., infinite at last
+      if v0 == 0:
+        v0, v1 = v1, v2
+      elif v1 == 0:
+        v0, v1 = v2, v0
+
+      p0 = self.__xy[v0]
+      p1 = self.__xy[v1]
       
-      orient = orientation(p0, p1, p)
+      orient = orient2d(p0[0], p0[1], p1[0], p1[1], p[0], p[1])
 
       if orient > 0: # p is outside convex hull
         return True
@@ -350,142 +481,241 @@ class DelaunayTriangulation:
       if orient == 0:  # in this case, only inside edge implies conflict
         return in_between(p0, p1, p)
 
+      return False
+
     else: # in case of finite face, proceed as always
       # compute incircle test
-      v0 = self.vertex(v0)
-      v1 = self.vertex(v1)
-      v2 = self.vertex(v2)
-      
-      p0 = v0.point
-      p1 = v1.point
-      p2 = v2.point
+      x0, y0 = self.__xy[v0]
+      x1, y1 = self.__xy[v1]
+      x2, y2 = self.__xy[v2]
 
-      orient = orientation(p0, p1, p2, p)
+      return incircle2d(x0, y0, x1, y1, x2, y2, p[0], p[1]) >= 0
 
-      if orient >= 0:
-        return True
-      else:
-        return False
+  def __in_conflict_many(self, p, faces, keys):
+    """\
+    Check if point `p` is in conflict with each face in `faces`, whose
+    sorted vertices are given by `keys`.
+
+    Finite faces are first tested against their cached circumcircles. The
+    undecided ones, too close to their circle or badly shaped, get exact
+    incircle tests, evaluated in a single batch. Infinite faces are handled
+    one by one by `__in_conflict`.
+    """
+    px, py = p
+    conflicts = [False]*len(faces)
+    finite = []
+    circles = self.__circles
+    for j, f in enumerate(faces):
+      key = keys[j]
+      if key[0] == 0: # infinite vertex comes first, once sorted
+        conflicts[j] = self.__in_conflict(p, f[0], f[1], f[2])
+        continue
+
+      circle = circles.get(key)
+      if circle is not None:
+        cx, cy, r2 = circle
+        d2 = (px - cx)**2 + (py - cy)**2
+        if d2 < r2*(1.0 - CIRCLE_TOLERANCE):
+          conflicts[j] = True
+          continue
+        if d2 > r2*(1.0 + CIRCLE_TOLERANCE):
+          continue
+
+      finite.append(j)
+
+    if finite:
+      coords = self.__points[numpy.array([faces[j] for j in finite])]
+      signs = incircles(coords[:,0], coords[:,1], coords[:,2], p)
+      for j, s in zip(finite, signs):
+        conflicts[j] = bool(s >= 0)
+
+    return conflicts
 
   def __find_first_conflict(self, p, hint):
     """Find first conflicting face with point `p` by walking, starting at face `hint`."""
     # Always start with a finite face (since it must exists at least one at this point)
-    if 0 in hint: # infinite face, find oposite face, which must be finite
-      i = hint.index(0)
+    v0, v1, v2 = hint
+    if v0 == 0 or v1 == 0 or v2 == 0: # infinite face, find oposite face, which must be finite
+      i = 0 if v0 == 0 else (1 if v1 == 0 else 2)
       hint = self.neighbor(i, hint)
 
-    # Main walking loop
-    found = False
-    while not found:
-      v0 = self.vertex(hint[0])
-      v1 = self.vertex(hint[1])
-      v2 = self.vertex(hint[2])
-      
-      p0 = v0.point
-      p1 = v1.point
-      p2 = v2.point
+    # bind lookups used at every step to locals
+    points = self.__xy
+    neighbor = self.__tds.neighbor
+    coin = self.__random.getrandbits
+
+    px, py = p
+
+    # Main walking loop, until `p` is located or leaves the convex hull
+    while True:
+      v0, v1, v2 = hint
+      x0, y0 = points[v0]
+      x1, y1 = points[v1]
+      x2, y2 = points[v2]
 
       # We use polarization to define a base-3 mask that helps to classify
       # the position of point `p` with relation to the triangle (p0,p1,p2).
       # There are 19 valid positions/codes (7 belonging to the triangle and
       # 12 outside it) and 8 invalid ones.
-      e0 = orientation(p0, p1, p) + 1
-      e1 = orientation(p1, p2, p) + 1
-      e2 = orientation(p2, p0, p) + 1
-      mask = int(e2*9 + e1*3 + e0)
+      e0, e1, e2 = orient2d_triangle(x0, y0, x1, y1, x2, y2, px, py)
+      mask = e2*9 + e1*3 + e0 + 13 # shifted from {-1,0,1} to {0,1,2}
+      action = WALK_ACTION[mask]
       
-      if mask in [11, 20, 19]: # walk to v0 opposite vertex
-        hint = self.neighbor(0, hint)
-      elif mask in [5, 7, 8]: # walk to v1 opposite vertex
-        hint = self.neighbor(1, hint)
-      elif mask in [15, 21, 24]: # walk to v2 opposite vertex
-        hint = self.neighbor(2, hint)
-      elif mask == 2: # walk to v0 or v1 opposite vertex
-        i = random.choice([0,1])
-        hint = self.neighbor(i, hint)
-      elif mask == 6: # walk to v1 or v2 opposite vertex
-        i = random.choice([1,2])
-        hint = self.neighbor(i, hint)
-      elif mask == 18: # walk to v2 or v0 opposite vertex
-        i = random.choice([0,2])
-        hint = self.neighbor(i, hint)
-      elif mask == 16: # found at vertex v0
-        found = True
-      elif mask == 22: # found at vertex v1
-        hint = [hint[1],hint[2],hint[0]]
-        found = True
-      elif mask == 14: # found at vertex v2
-        hint = [hint[2],hint[0],hint[1]]
-        found = True
-      elif mask == 25: # found at edge (v0,v1)
-        found = True
-      elif mask == 23: # found at edge (v1,v2)
-        hint = [hint[1],hint[2],hint[0]]
-        found = True
-      elif mask == 17: # found at edge (v2,v0)
-        hint = [hint[2],hint[0],hint[1]]
-        found = True
-      elif mask == 26: # found inside face (v0,v1,v2)
-        found = True
-      else: # 0 | 1 | 3 | 4 | 9 | 10 | 12 | 13: # undefined
-        return None
+      if action <= WALK_TO_V2:
+        if action == UNDEFINED:
+          return None
+        hint = neighbor(action, hint)
+      elif action == FOUND: # rotate, so p is at v0, or at edge (v0,v1), or inside
+        rotation = WALK_ROTATION[mask]
+        if rotation is not None:
+          hint = (hint[rotation[0]], hint[rotation[1]], hint[rotation[2]])
+        return hint
+      else: # walk to either of two opposite faces, at random
+        i = WALK_CHOICE[action][coin(1)]
+        hint = neighbor(i, hint)
 
       if hint[2] == 0: # p is outside the convex hull
-        break
-      else: # could not be an infinite face
-        assert 0 not in hint
+        return hint
 
-    return hint
+      if __debug__: # could not be an infinite face
+        assert 0 not in hint
 
   def __find_more_conflicts(self, p, first):
-    """Find more conflicting faces with point `p` by inspecting `first`'s neighborhood."""
-    conflict = [first]
-    cavity = []
-    Q = Queue(maxsize = 0) # do we need an infinite size queue?
-    Q.put(first)
-    visited = numpy.full(self.number_of_vertices, False)
-
-    while not Q.empty():
-      face = Q.get()
-      # check each neighbor face for conflict
+    """\
+    Find more conflicting faces with point `p` by inspecting `first`'s neighborhood.
+
+    The returned lists are buffers owned by the triangulation, which are
+    overwritten by the next call.
+    """
+    conflict = self.__conflict
+    cavity = self.__cavity
+    conflict.clear()
+    cavity.clear()
+    conflict.append(first)
+    neighbor = self.__tds.neighbor
+
+    # faces already tested, keyed by their sorted vertices
+    enqueued = self.__conflict_keys # in conflict
+    enqueued.clear()
+    enqueued.add(tuple(sorted(first)))
+    rejected = self.__rejected_keys # not in conflict
+    rejected.clear()
+
+    # every face found in conflict is appended to `conflict`, exactly once,
+    # so the conflict set itself serves as the queue of faces to expand
+    # (list iterators do reach items appended during the iteration)
+    for face in conflict:
+      # gather the neighbor faces to check for conflict
+      edges = []
+      keys = []
+      neighbors = []
       for i in range(3):
-        N = self.neighbor(i, face)
+        N = neighbor(i, face)
+        key = tuple(sorted(N))
+        edge = (face[CCW[i]], face[CW[i]]) # shared with N
 
-        # if visited, skip
-        if visited[N[0]] and visited[N[1]] and visited[N[2]]:
+        # if already in the conflict set, the shared edge is interior to the cavity
+        if key in enqueued:
           continue
 
-        in_conflict = self.__in_conflict(p, N[0], N[1], N[2])
+        # if already rejected, the shared edge is on the boundary of the cavity
+        if key in rejected:
+          cavity.append(edge)
+          continue
 
-        if in_conflict:
+        edges.append(edge)
+        keys.append(key)
+        neighbors.append(N)
+
+      # check them all at once
+      in_conflict = self.__in_conflict_many(p, neighbors, keys)
+
+      for edge, key, N, c in zip(edges, keys, neighbors, in_conflict):
+        if c:
+          enqueued.add(key)
           conflict.append(N)
-          Q.put(N)
         else: # we've reached the boundary of the cavity
-          cavity.append([face[ccw(i)], face[cw(i)]])
-
-      # mark vertices as visited
-      visited[numpy.array(face)] = True
+          rejected.add(key)
+          cavity.append(edge)
     
     return conflict, cavity
   
   def __remove_conflict(self, conflict):
     """Remove faces belonging to the conflict set."""
+    remove_face = self.__tds.remove_face
     for face in conflict:
       v0 = face[0]
       v1 = face[1]
       v2 = face[2]
-      self.__remove_face(v0, v1, v2)
+      remove_face(v0, v1, v2)
+      self.__circles.pop(tuple(sorted(face)), None)
+
+  def __update_cavity(self, p, conflict, cavity):
+    """\
+    Replace the conflict set by all faces induced by `p` and its cavity.
+
+    This fuses `__remove_conflict` and `__fill_cavity` into a single pass,
+    which drops stale circumcircles by the keys gathered while searching the
+    conflict set, instead of sorting every removed face again.
+
+    Returns a face incident to the new vertex, finite if possible.
+    """
+    circles = self.__circles
+    for key in self.__conflict_keys:
+      circles.pop(key, None)
+
+    v0 = self.__tds.refill(conflict, cavity)
+    self.__set_point(v0, p)
+
+    # Every new face shares the new vertex, so its circumcircle is computed
+    # as in __cache_circumcircle, but relative to `p`, which is loaded once.
+    # The new vertex is also the last one, so sorted keys come for free.
+    xy = self.__xy
+    rx, ry = xy[v0]
+    face = None
+    for edge in cavity:
+      v1 = edge[0]
+      v2 = edge[1]
+      if v1 != 0 and v2 != 0:
+        px, py = xy[v1]
+        qx, qy = xy[v2]
+        x_rp = px - rx
+        y_rp = py - ry
+        x_rq = qx - rx
+        y_rq = qy - ry
+
+        d_rp = x_rp*x_rp + y_rp*y_rp
+        d_rq = x_rq*x_rq + y_rq*y_rq
+        det = x_rp*y_rq - x_rq*y_rp
+
+        circle = None
+        if abs(det) > CIRCLE_SHAPE*max(d_rp, d_rq):
+          den = 0.5 / det
+          dx = (d_rp*y_rq - d_rq*y_rp)*den
+          dy = (x_rp*d_rq - x_rq*d_rp)*den
+          circle = (rx + dx, ry + dy, dx*dx + dy*dy)
+
+        circles[(v1, v2, v0) if v1 < v2 else (v2, v1, v0)] = circle
+        face = (v0, v1, v2)
+
+    if face is None:
+      face = (v0, cavity[0][0], cavity[0][1])
+
+    return face
 
   def __fill_cavity(self, p, cavity):
     """Insert all faces induced by `p` and its cavity."""
     self.__create_vertex()
-    v0 = self.number_of_vertices - 1
+    v0 = self.__tds.number_of_vertices - 1
+    self.__set_point(v0, p)
+
+    insert_face = self.__tds.insert_face
     for edge in cavity:
       v1 = edge[0]
       v2 = edge[1]
-      self.__insert_face(v0, v1, v2)
-    
-    self.vertex(v0).set_point(p)
+      insert_face(v0, v1, v2)
+      if v1 != 0 and v2 != 0:
+        self.__cache_circumcircle(v0, v1, v2)
 
   # start at any face incident to the last inserted vertex.
   def __get_walk_hint(self):
@@ -511,48 +741,37 @@ class DelaunayTriangulation:
 
   def draw_conflict(self, conflict):
     """Draw conflict set over the current active canvas."""
-    for face in conflict:
-      iv0 = face[0]
-      iv1 = face[1]
-      iv2 = face[2]
-      if not self.__is_infinite(iv0, iv1, iv2):
-        v0 = self.vertex(iv0)
-        v1 = self.vertex(iv1)
-        v2 = self.vertex(iv2)
-        self.__canvas.draw_triangle(v0.point, v1.point, v2.point, filled=True)
+    faces = [face for face in conflict if not self.__is_infinite(face[0], face[1], face[2])]
+    if faces:
+      self.__canvas.draw_triangles(self.__points[numpy.array(faces)], filled=True)
 
   def draw_circumcircles(self, faces):
     """Draw circumcircles over the current active canvas."""
-    circles = []
-    for face in faces:
-      iv0 = face[0]
-      iv1 = face[1]
-      iv2 = face[2]
-      if not self.__is_infinite(iv0, iv1, iv2):
-        v0 = self.vertex(iv0)
-        v1 = self.vertex(iv1)
-        v2 = self.vertex(iv2)
-
-        c,r = circumcircle(v0.point, v1.point, v2.point)
-        circles.append(Circle(c, r))
+    finite = [f for f in faces if not self.__is_infinite(f[0], f[1], f[2])]
+    if len(finite) == 0:
+      return
 
-    self.__canvas.draw_circle(circles)
+    # compute all circles at once, from the points cache
+    triangles = self.__points[numpy.array(finite)]
+    centers, radii = circumcircles(triangles[:,0], triangles[:,1], triangles[:,2])
+    self.__canvas.draw_circles(centers, radii)
 
   def draw_cavity(self, cavity):
     """Draw cavity over the current active canvas."""
+    segments = []
     for edge in cavity:
       iv0 = edge[0]
       iv1 = edge[1]
       if not self.__is_infinite(iv0, iv1):
-        v0 = self.vertex(iv0)
-        v1 = self.vertex(iv1)
-        self.__canvas.draw_segment(v0.point, v1.point)
+        segments.append(self.__points[[iv0, iv1]])
+
+    if segments:
+      self.__canvas.draw_segments(segments)
 
   def draw(self, with_labels = False):
     """Draw the full triangulation over the current active canvas."""
     if self.__canvas is None:
-      bbox = copy.deepcopy(self.__bbox)
-      bbox.scale(1.25)
+      bbox = self.__bbox.scaled(1.25)
       self.__canvas = Canvas(bbox)
 
     self.__canvas.begin()
@@ -561,13 +780,14 @@ class DelaunayTriangulation:
 
   def __draw(self, with_labels):
     """Helper method to draw a full triangulation."""
+    faces = []
     for iv0 in range(1, self.number_of_vertices): # skip infinite vertex
-      faces = self.incident_faces(iv0)
-      for f in faces:
-        if not self.__is_infinite(f[0], f[1], f[2]):
-            v0 = self.vertex(f[0])
-            v1 = self.vertex(f[1])
-            v2 = self.vertex(f[2])
-            self.__canvas.draw_triangle(v0.point, v1.point, v2.point, filled=False)
+      for f in self.incident_faces(iv0):
+        # each face is incident to three vertices, keep it once
+        if f[1] > iv0 and f[2] > iv0:
+          faces.append(f)
+
+    if faces:
+      self.__canvas.draw_triangles(self.__points[numpy.array(faces)], filled=False)
     if with_labels:
       self.draw_labels()
\ No newline at end of file
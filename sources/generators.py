@@ -31,6 +31,12 @@ class Generator:
     - points distributed according to the Kuzmin distribution;
     - points distributed along the line segment [0,1).
 
+  All point sets are returned as (n,2) arrays of coordinates, which
+  every consumer in this package accepts (see `geometry.to_coords`). Use
+  `geometry.to_points` where `Point`-like objects are still needed.
+  Coordinates may be drawn as float32 to save memory, but the triangulation
+  still upcasts them to float64 before evaluating any predicate.
+
   Parameters
   ----------
     seed : int (default: None)
@@ -39,7 +45,8 @@ class Generator:
   Examples
   --------
   >>> generate = Generator()
-  >>> generate.uniform_distribution(10)
+  >>> generate.uniform_distribution(10).shape
+  (10, 2)
 
   References
   ----------
@@ -61,64 +68,57 @@ class Generator:
     """Returns a reference to the random number generator."""
     return self.__random
 
-  def uniform(self):
-    """Draws random samples from a uniform distribution."""
-    return self.random.uniform()
+  def uniform(self, size = None):
+    """Draws random samples from a uniform distribution, `size` of them at once."""
+    return self.random.uniform(size=size)
   
-  def normal(self):
-    """Draws random samples from a normal distribution."""
-    return self.random.normal()
+  def normal(self, size = None):
+    """Draws random samples from a normal distribution, `size` of them at once."""
+    return self.random.normal(size=size)
 
-  def uniform_distribution(self, n):
+  def uniform_distribution(self, n, dtype = numpy.float64):
     """\
     Generate points uniformly in the unit square [0,1)^2.
 
     The algorithm draws floating points numbers for each coordinate in the
-    interval [0,1) using `numpy` uniform generator.
+    interval [0,1) using `numpy` uniform generator, all in a single call.
 
     Parameters
     ----------
       n : (int)
         The number of points to be generated.
+      dtype : (numpy.dtype)
+        Coordinate type, either numpy.float64 (default) or numpy.float32.
 
     Returns
     --------
       points : numpy.array
-        An array of random points.
+        A (n,2) `dtype` array with the coordinates of the random points.
     """
-    points = []
-    for i in range(n):
-      points.append(Point(self.uniform(), self.uniform()))
-    return numpy.array(points)
+    return self.random.random((n, 2), dtype=dtype)
   
-  def normal_distribution(self, n):
+  def normal_distribution(self, n, dtype = numpy.float64):
     """\
     Generate points normally in the unit square [0,1)^2.
 
     The algorithm draws floating points numbers for each coordinate in the
-    interval [0,1) using `numpy` normal generator.
+    interval [0,1) using `numpy` normal generator, all in a single call.
 
     Parameters
     ----------
       n : (int)
         The number of points to be generated.
+      dtype : (numpy.dtype)
+        Coordinate type, either numpy.float64 (default) or numpy.float32.
 
     Returns
     --------
       points : numpy.array
-        An array of random points.
+        A (n,2) `dtype` array with the coordinates of the random points.
     """
-    points = []
-    for i in range(n):
-      points.append(Point(self.normal(), self.normal()))
-    return numpy.array(points)
-
-  def __kuzmin_radius(self):
-    """Kuzmin radius generator."""
-    X = self.uniform()
-    return numpy.sqrt( (1.0/(1.0 - X))**2 - 1 )
+    return self.random.standard_normal((n, 2), dtype=dtype)
 
-  def kuzmin_distribution(self, n):
+  def kuzmin_distribution(self, n, dtype = numpy.float64):
     """\
     Generate points according to the Kuzmin distribution.
 
@@ -129,34 +129,40 @@ class Generator:
     ----------
       n : (int)
         The number of points to be generated.
+      dtype : (numpy.dtype)
+        Coordinate type, either numpy.float64 (default) or numpy.float32.
 
     Returns
     --------
       points : numpy.array
-        An array of random points.
+        A (n,2) `dtype` array with the coordinates of the random points.
 
     References
     ----------
       Blelloch, Guy E. et al. Design and implementation of a practical parallel
         Delaunay algorithm. Algorithmica, v. 24, p. 243-269, 1999.
     """
-    s = 0.0
-    points = []
-    while len(points) < n:
-      theta = 2 * numpy.pi * self.uniform()
-      r = self.__kuzmin_radius()
-      x = r * numpy.cos(theta)
-      y = r * numpy.sin(theta)
-      points.append(Point(x,y))
-      s = max(r, s) # inverse scale
-      
-    # apply scale so as to get points inside unit disk
-    for p in points:
-      p.set_coords(p.x/s, p.y/s)
+    points = self.random.random((n, 2), dtype=dtype) # angle and radius samples, per point
+    theta = 2 * numpy.pi * points[:,0]
 
-    return numpy.array(points)
+    # r = sqrt( (1/(1 - X))^2 - 1 ), evaluated in place
+    r = 1.0 - points[:,1]
+    numpy.reciprocal(r, out=r)
+    r *= r
+    r -= 1.0
+    numpy.sqrt(r, out=r)
+
+    # apply scale so as to get points inside unit disk
+    if n > 0:
+      r /= r.max()
+
+    # the samples are no longer needed, so their buffer holds the result
+    numpy.cos(theta, out=points[:,0])
+    numpy.sin(theta, out=points[:,1])
+    points *= r[:,numpy.newaxis]
+    return points
   
-  def line_distribution(self, n, b = 0.001):
+  def line_distribution(self, n, b = 0.001, sd = 0.0, dtype = numpy.float64):
     """\
     Generate points according to the Line distribution.
 
@@ -167,25 +173,28 @@ class Generator:
     ----------
       n  : (int)
         Number of points to be generated.
+      b  : (double)
+        Line parameter; the smaller it is, the closer points are to the line.
       sd : (double)
-        Standard deviation for the gaussian noise.
+        Standard deviation for the gaussian noise (none, by default).
+      dtype : (numpy.dtype)
+        Coordinate type, either numpy.float64 (default) or numpy.float32.
 
     Returns
     --------
       points : numpy.array
-        An array of random points.
+        A (n,2) `dtype` array with the coordinates of the random points.
 
     References
     ----------
       Blelloch, Guy E. et al. Design and implementation of a practical parallel
         Delaunay algorithm. Algorithmica, v. 24, p. 243-269, 1999.
     """
-    points = []
-    for i in range(n):
-      u = self.uniform()
-      v = self.uniform()
-      x = u
-      y = b/(v - b*v + b)
-      points.append(Point(x,y))
-      
-    return numpy.array(points)
\ No newline at end of file
+    points = self.random.random((n, 2), dtype=dtype) # x = u and y = b/(v - b*v + b)
+    v = points[:,1]
+    points[:,1] = b/(v - b*v + b)
+
+    # gaussian noise is drawn for all points at once
+    if sd > 0.0:
+      points += sd * self.random.standard_normal((n, 2), dtype=dtype)
+    return points
@@ -17,11 +17,18 @@ CC0 1.0 Universal for more details.
 
 Author(s): Vicente Sobrinho <vicente.sobrinho@ufca.edu.br>
 """
+import itertools
+import math
 import numpy
 
 # Shewchuck geometric predicates
 import geompreds as gp
 
+# Error bounds of the floating-point filters (Shewchuk's ccwerrboundA and iccerrboundA)
+EPSILON = 2.0**-53
+CCWERRBOUND_A = (3.0 + 16.0*EPSILON)*EPSILON
+ICCERRBOUND_A = (10.0 + 96.0*EPSILON)*EPSILON
+
 # Comparison result
 SMALLER = -1
 EQUAL   = +0
@@ -40,11 +47,17 @@ class Point:
     y : number type (convertible to float64)
         Point ordinate.
           least the following methods:
+
+  Coordinates are kept as plain Python floats, and the class declares its
+  slots, so points are cheap to build and to read. Bulk coordinates are
+  better kept in (n,2) arrays (see `to_coords`).
   """
+  __slots__ = ('__x', '__y', '__id')
+
   def __init__(self, x, y):
     """Constructs a Point from its coordinates."""
-    self.__x = numpy.float64(x)
-    self.__y = numpy.float64(y)
+    self.__x = float(x)
+    self.__y = float(y)
     self.__id = None
 
   def __repr__(self):
@@ -67,21 +80,61 @@ class Point:
   
   def set_coords(self, x, y):
     """Set the point coordinates."""
-    self.__x = x
-    self.__y = y
+    self.__x = float(x)
+    self.__y = float(y)
 
   def set_x(self, x):
     """Set the point abscissa."""
-    self.__x = x
+    self.__x = float(x)
 
   def set_y(self, y):
     """Set the point ordinate."""
-    self.__y = y
+    self.__y = float(y)
 
   def set_id(self, id):
     """Set the point identification number."""
     self.__id = id
 
+class PointView:
+  """\
+  A read-only `Point` interface over a row of a (n,2) coordinate array.
+
+  No coordinates are copied: the view keeps a reference to the array and
+  reads its row on access. This suits point sets kept as contiguous arrays,
+  where `Point` objects would duplicate the storage.
+
+  Parameters
+  ----------
+    coords : numpy.array
+        A (n,2) array of coordinates.
+    i : int
+        Row of the viewed point.
+  """
+  __slots__ = ('__coords', '__i')
+
+  def __init__(self, coords, i):
+    """Constructs a view of the i-th row of `coords`."""
+    self.__coords = coords
+    self.__i = i
+
+  def __repr__(self):
+    return f"PointView({self.x}, {self.y})"
+
+  @property
+  def x(self):
+    """Returns its abscissa."""
+    return float(self.__coords[self.__i,0])
+
+  @property
+  def y(self):
+    """Returns its ordinate."""
+    return float(self.__coords[self.__i,1])
+
+  @property
+  def coords(self):
+    """Returns the point coordinates."""
+    return (self.x, self.y)
+
 class Circle:
   """\
   Representation class of a 2D circle.
@@ -95,6 +148,8 @@ class Circle:
     radius : number type (convertible to float64)
         The circle radius.
   """
+  __slots__ = ('__center', '__radius')
+
   def __init__(self, center: Point, radius):
     """Constructs a circle with the given center and radius."""
     self.__center = center
@@ -116,6 +171,8 @@ class BoundingBox:
 
   This class provides methods to get and set bounding box properties.
   """
+  __slots__ = ('__min', '__max')
+
   def __init__(self, xmin=-numpy.inf, ymin=-numpy.inf,
                      xmax=numpy.inf, ymax=numpy.inf):
     """Constructs a bounding box, initially, unbounded."""
@@ -126,38 +183,44 @@ class BoundingBox:
     return f"BoundingBox(min.x={self.min.x}, min.y={self.min.y}, " \
                         f"max.x={self.max.x}, max.y={self.max.y})"
 
+  def copy(self):
+    """Returns a copy of the bounding box."""
+    return BoundingBox(self.__min.x, self.__min.y, self.__max.x, self.__max.y)
+
+  def scaled(self, scale):
+    """Returns a scaled copy of the bounding box."""
+    return BoundingBox(*self.__scaled_corners(scale))
+
   def fit(self, points):
     """Fit the bounding box to the given point set."""
-    xmin = xmax = points[0].x
-    ymin = ymax = points[0].y
-    for p in points[1:]:
-      xmin = min(p.x, xmin)
-      ymin = min(p.y, ymin)
-
-      xmax = max(p.x, xmax)
-      ymax = max(p.y, ymax)
+    coords = to_coords(points)
+    xmin, ymin = coords.min(axis=0)
+    xmax, ymax = coords.max(axis=0)
 
     self.__min = Point(xmin, ymin)
     self.__max = Point(xmax, ymax)
 
   def expand(self, points):
     """Expand the bounding box so as to contain the given point set."""
-    xmin = self.__min.x
-    ymin = self.__min.y
-    xmax = self.__max.x
-    ymax = self.__max.y
-    for p in points:
-      xmin = min(p.x, xmin)
-      ymin = min(p.y, ymin)
+    coords = to_coords(points)
+    if len(coords) == 0:
+      return
 
-      xmax = max(p.x, xmax)
-      ymax = max(p.y, ymax)
+    xmin, ymin = numpy.minimum(coords.min(axis=0), self.__min.coords)
+    xmax, ymax = numpy.maximum(coords.max(axis=0), self.__max.coords)
 
     self.__min = Point(xmin, ymin)
     self.__max = Point(xmax, ymax)
 
   def scale(self, scale):
     """Apply a given scale to the bounding box."""
+    xmin, ymin, xmax, ymax = self.__scaled_corners(scale)
+
+    self.__min = Point(xmin, ymin)
+    self.__max = Point(xmax, ymax)
+
+  def __scaled_corners(self, scale):
+    """Returns (xmin, ymin, xmax, ymax) of the bounding box scaled about its center."""
     xmin = self.__min.x
     ymin = self.__min.y
     xmax = self.__max.x
@@ -174,8 +237,7 @@ class BoundingBox:
     xmax = scale*(xmax - cx) + cx
     ymax = scale*(ymax - cy) + cy
 
-    self.__min = Point(xmin, ymin)
-    self.__max = Point(xmax, ymax)
+    return xmin, ymin, xmax, ymax
 
   @property
   def min(self):
@@ -195,33 +257,34 @@ class BoundingBox:
     """Sets the bounding box upper-right corner."""
     self.__max = Point(x,y)
       
-def __det2(a00, a01, a10, a11):
-  """Returns the determinant of a 2x2 matrix."""
-  return a00*a11 - a10*a01
-
 def __circumcircle(p, q, r):
   """Computes the circumradius and circumcenter of a non-degenerate \
     triangle (p,q,r)."""
-  x_rp = p.x - r.x
-  y_rp = p.y - r.y
-  x_rq = q.x - r.x
-  y_rq = q.y - r.y
-  x_pq = q.x - p.x
-  y_pq = q.y - p.y
+  px, py = p.coords
+  qx, qy = q.coords
+  rx, ry = r.coords
+
+  x_rp = px - rx
+  y_rp = py - ry
+  x_rq = qx - rx
+  y_rq = qy - ry
+  x_pq = qx - px
+  y_pq = qy - py
 
   d_rp = x_rp*x_rp + y_rp*y_rp
   d_rq = x_rq*x_rq + y_rq*y_rq
   d_pq = x_pq*x_pq + y_pq*y_pq
 
-  numx = __det2(d_rp, y_rp, d_rq, y_rq)
-  numy = __det2(x_rp, d_rp, x_rq, d_rq)
+  # 2x2 determinants, inlined
+  numx = d_rp*y_rq - d_rq*y_rp
+  numy = x_rp*d_rq - x_rq*d_rp
 
-  den = 0.5 / __det2(x_rp, y_rp, x_rq, y_rq)
+  den = 0.5 / (x_rp*y_rq - x_rq*y_rp)
 
-  c_x = r.x + numx * den
-  c_y = r.y + numy * den
+  c_x = rx + numx * den
+  c_y = ry + numy * den
 
-  numr = numpy.sqrt( d_rp * d_rq * d_pq )
+  numr = math.sqrt( d_rp * d_rq * d_pq )
   r = numr * den
 
   return Point(c_x, c_y), r
@@ -250,25 +313,230 @@ def circumcircle(p, q, r):
   Shewchuk, J. R., Lecture Notes on Robust Geometric Predicates,
     URL: https://people.eecs.berkeley.edu/~jrs/meshpapers/robnotes.pdf
   """
-  orient = orientation(p, q, r)
+  orient = orientation(p.coords, q.coords, r.coords)
   assert orient != 0 # not COLLINEAR?
   return __circumcircle(p, q, r)
 
-def orientation(p0: Point, p1: Point, p2: Point, p3 = None):
-  """A wrapper over Schewchuk's predicates."""
+def circumcircles(p, q, r):
+  """\
+  Vectorized circumcircle construction over arrays of triangles.
+
+  Applies the same Schewchuk's formulas of `circumcircle` to all triangles
+  at once. Degenerate triangles, as certified by `orientations`, get NaN
+  centers and infinite radii, even if rounding made their denominator
+  nonzero.
+
+  Parameters
+  ----------
+    p, q, r : numpy.array, numpy.array, numpy.array
+        (k,2) arrays of triangle vertices.
+
+  Returns
+  -------
+    centers : numpy.array
+      A (k,2) array with the circumcenter of each triangle (p[i],q[i],r[i]).
+    radii : numpy.array
+      The circumradius of each triangle (p[i],q[i],r[i]).
+  """
+  rp = p - r
+  rq = q - r
+  pq = q - p
+
+  d_rp = (rp*rp).sum(axis=1)
+  d_rq = (rq*rq).sum(axis=1)
+  d_pq = (pq*pq).sum(axis=1)
+
+  numx = d_rp*rq[:,1] - d_rq*rp[:,1]
+  numy = rp[:,0]*d_rq - rq[:,0]*d_rp
+
+  with numpy.errstate(divide='ignore', invalid='ignore'):
+    den = 0.5 / (rp[:,0]*rq[:,1] - rq[:,0]*rp[:,1])
+
+  centers = r + numpy.column_stack((numx, numy))*den[:,None]
+  radii = numpy.abs(numpy.sqrt(d_rp*d_rq*d_pq)*den)
+
+  collinear = orientations(p, q, r) == 0
+  centers[collinear] = numpy.nan
+  radii[collinear] = numpy.inf
+
+  return centers, radii
+
+def __sign(det):
+  """Returns the sign of an exactly evaluated determinant, as an int."""
+  if det > 0:
+    return 1
+  if det < 0:
+    return -1
+  return 0
+
+def orientation(p0, p1, p2, p3 = None):
+  """\
+  A wrapper over Schewchuk's predicates, taking (x,y) coordinate pairs.
+
+  The determinant is first evaluated in floating-point arithmetic. The exact
+  predicate is only called when its sign cannot be certified by Shewchuk's
+  error bound, which is rare for non-degenerate inputs.
+  """
   if p3 is None:
-    return numpy.sign(gp.orient2d(p0.coords, p1.coords, p2.coords))
+    return orient2d(p0[0], p0[1], p1[0], p1[1], p2[0], p2[1])
   else:
-    return numpy.sign(gp.incircle(p0.coords, p1.coords, p2.coords, p3.coords))
-  
-def __compare(a, b):
-  """Compares two numbers."""
-  if (a < b):
-    return SMALLER
-  if (a > b):
-    return LARGER
-  return EQUAL
+    return incircle2d(p0[0], p0[1], p1[0], p1[1], p2[0], p2[1], p3[0], p3[1])
+
+def orient2d(ax, ay, bx, by, cx, cy):
+  """Returns the sign of the orientation of (a,b,c), given as scalar coordinates."""
+  detleft  = (ax - cx)*(by - cy)
+  detright = (ay - cy)*(bx - cx)
+  det = detleft - detright
+  if abs(det) > CCWERRBOUND_A*(abs(detleft) + abs(detright)):
+    return 1 if det > 0 else -1 # certified to be nonzero
+  return __sign(gp.orient2d((ax, ay), (bx, by), (cx, cy)))
+
+def orient2d_triangle(ax, ay, bx, by, cx, cy, px, py):
+  """\
+  Returns the signs of the orientations of (a,b,p), (b,c,p) and (c,a,p).
+
+  The three tests share the query point `p`, so the differences to it are
+  computed once. As in `orient2d`, signs that the floating-point filter
+  cannot certify are recomputed with the exact predicate.
+  """
+  adx = ax - px
+  ady = ay - py
+  bdx = bx - px
+  bdy = by - py
+  cdx = cx - px
+  cdy = cy - py
+
+  abl = adx*bdy
+  abr = ady*bdx
+  bcl = bdx*cdy
+  bcr = bdy*cdx
+  cal = cdx*ady
+  car = cdy*adx
+  ab = abl - abr
+  bc = bcl - bcr
+  ca = cal - car
+
+  if abs(ab) > CCWERRBOUND_A*(abs(abl) + abs(abr)):
+    e0 = 1 if ab > 0 else -1 # certified to be nonzero
+  else:
+    e0 = __sign(gp.orient2d((ax, ay), (bx, by), (px, py)))
+
+  if abs(bc) > CCWERRBOUND_A*(abs(bcl) + abs(bcr)):
+    e1 = 1 if bc > 0 else -1
+  else:
+    e1 = __sign(gp.orient2d((bx, by), (cx, cy), (px, py)))
+
+  if abs(ca) > CCWERRBOUND_A*(abs(cal) + abs(car)):
+    e2 = 1 if ca > 0 else -1
+  else:
+    e2 = __sign(gp.orient2d((cx, cy), (ax, ay), (px, py)))
+
+  return e0, e1, e2
+
+def incircle2d(ax, ay, bx, by, cx, cy, dx, dy):
+  """Returns the sign of the incircle test of (a,b,c,d), given as scalar coordinates."""
+  adx = ax - dx
+  ady = ay - dy
+  bdx = bx - dx
+  bdy = by - dy
+  cdx = cx - dx
+  cdy = cy - dy
+
+  bdxcdy = bdx*cdy
+  cdxbdy = cdx*bdy
+  cdxady = cdx*ady
+  adxcdy = adx*cdy
+  adxbdy = adx*bdy
+  bdxady = bdx*ady
+
+  alift = adx*adx + ady*ady
+  blift = bdx*bdx + bdy*bdy
+  clift = cdx*cdx + cdy*cdy
+
+  det = alift*(bdxcdy - cdxbdy) + blift*(cdxady - adxcdy) + clift*(adxbdy - bdxady)
+  permanent = (abs(bdxcdy) + abs(cdxbdy))*alift \
+            + (abs(cdxady) + abs(adxcdy))*blift \
+            + (abs(adxbdy) + abs(bdxady))*clift
+  if abs(det) > ICCERRBOUND_A*permanent:
+    return 1 if det > 0 else -1 # certified to be nonzero
+  return __sign(gp.incircle((ax, ay), (bx, by), (cx, cy), (dx, dy)))
+
+def incircles(p0, p1, p2, p3):
+  """\
+  Vectorized incircle test over arrays of points.
+
+  The determinants are first evaluated in floating-point arithmetic, all at
+  once. Only those whose magnitude falls below Shewchuk's error bound are
+  recomputed with the exact predicate, so results are always exact.
+
+  Parameters
+  ----------
+    p0, p1, p2, p3 : numpy.array, numpy.array, numpy.array, numpy.array
+        (k,2) arrays of coordinates (or (2,) arrays, broadcast to the others).
 
+  Returns
+  -------
+    signs : numpy.array
+        The sign of the incircle test of each (p0[i], p1[i], p2[i], p3[i]).
+  """
+  p0, p1, p2, p3 = numpy.broadcast_arrays(p0, p1, p2, p3)
+  adx = p0[:,0] - p3[:,0]
+  ady = p0[:,1] - p3[:,1]
+  bdx = p1[:,0] - p3[:,0]
+  bdy = p1[:,1] - p3[:,1]
+  cdx = p2[:,0] - p3[:,0]
+  cdy = p2[:,1] - p3[:,1]
+
+  bdxcdy = bdx*cdy
+  cdxbdy = cdx*bdy
+  cdxady = cdx*ady
+  adxcdy = adx*cdy
+  adxbdy = adx*bdy
+  bdxady = bdx*ady
+
+  alift = adx*adx + ady*ady
+  blift = bdx*bdx + bdy*bdy
+  clift = cdx*cdx + cdy*cdy
+
+  det = alift*(bdxcdy - cdxbdy) + blift*(cdxady - adxcdy) + clift*(adxbdy - bdxady)
+  permanent = (numpy.abs(bdxcdy) + numpy.abs(cdxbdy))*alift \
+            + (numpy.abs(cdxady) + numpy.abs(adxcdy))*blift \
+            + (numpy.abs(adxbdy) + numpy.abs(bdxady))*clift
+
+  signs = numpy.sign(det)
+  for i in numpy.flatnonzero(numpy.abs(det) <= ICCERRBOUND_A*permanent):
+    signs[i] = __sign(gp.incircle(tuple(p0[i]), tuple(p1[i]), tuple(p2[i]), tuple(p3[i])))
+
+  return signs
+
+def orientations(p0, p1, p2):
+  """\
+  Vectorized orientation test over arrays of points.
+
+  As in `incircles`, only the determinants that cannot be certified by
+  Shewchuk's error bound are recomputed with the exact predicate.
+
+  Parameters
+  ----------
+    p0, p1, p2 : numpy.array, numpy.array, numpy.array
+        (k,2) arrays of coordinates (or (2,) arrays, broadcast to the others).
+
+  Returns
+  -------
+    signs : numpy.array
+        The sign of the orientation of each (p0[i], p1[i], p2[i]).
+  """
+  p0, p1, p2 = numpy.broadcast_arrays(p0, p1, p2)
+  detleft  = (p0[:,0] - p2[:,0])*(p1[:,1] - p2[:,1])
+  detright = (p0[:,1] - p2[:,1])*(p1[:,0] - p2[:,0])
+  det = detleft - detright
+
+  signs = numpy.sign(det)
+  for i in numpy.flatnonzero(numpy.abs(det) <= CCWERRBOUND_A*(numpy.abs(detleft) + numpy.abs(detright))):
+    signs[i] = __sign(gp.orient2d(tuple(p0[i]), tuple(p1[i]), tuple(p2[i])))
+
+  return signs
+  
 def in_between(p, q, r):
   """\
      """
@@ -280,22 +548,45 @@ def in_between(p, q, r):
 
   Parameters
   ----------
-    p, q, r : Point, Point, Point
-        Collinear points.
+    p, q, r : (x,y), (x,y), (x,y)
+        Coordinates of collinear points.
 
   Returns
   -------
     True if point `r` is strictly between `p` and `q`.
     False, otherwise.
   """
-  c_pq = __compare(p.x, q.x)
-  c_pr = None
-  c_rq = None
-  if (c_pq == EQUAL):
-    c_pr = __compare(p.y, r.y)
-    c_rq = __compare(r.y, q.y)
-  else:
-    c_pr = __compare(p.x, r.x)
-    c_rq = __compare(r.x, q.x)
+  # compare abscissae, unless the points lie on a vertical line
+  i = 1 if p[0] == q[0] else 0
+  a = p[i]
+  c = r[i]
+  return (c < q[i]) if a < c else (q[i] < c < a)
+
+def to_coords(points):
+  """\
+  Returns the coordinates of a planar point set as a contiguous array.
 
-  return ( (c_pr == SMALLER) and (c_rq == SMALLER) ) or ( (c_pr == LARGER)  and (c_rq == LARGER) )
\ No newline at end of file
+  Parameters
+  ----------
+    points : random access container (list or numpy.array)
+        Container of 2D points, either `Point` (or `PointView`) objects, (x,y)
+        pairs or a (n,2) array.
+
+  Returns
+  -------
+    coords : numpy.array
+        A (n,2) float64 array with the point coordinates.
+  """
+  if isinstance(points, numpy.ndarray) and points.dtype != object:
+    return numpy.ascontiguousarray(points, dtype=numpy.float64)
+
+  # stream the coordinates into a single preallocated buffer, so neither an
+  # intermediate list nor numpy's type inference over it are needed
+  n = len(points)
+  coords = itertools.chain.from_iterable(
+    p.coords if isinstance(p, (Point, PointView)) else p for p in points)
+  return numpy.fromiter(coords, dtype=numpy.float64, count=2*n).reshape(n, 2)
+
+def to_points(coords):
+  """Returns a list of `PointView` objects over a (n,2) array of coordinates."""
+  return [PointView(coords, i) for i in range(len(coords))]
\ No newline at end of file
@@ -19,11 +19,10 @@ CC0 1.0 Universal for more details.
 Author(s): Vicente Sobrinho <vicente.sobrinho@ufca.edu.br>
 """
 import numpy
-from numpy import random
 
 # Import from local packages
 from .geometry import Point
-from .utils import cw, ccw
+from .utils import CW, CCW
 from .log import *
 
 # Vertex status
@@ -38,6 +37,9 @@ GUARDED_FACE   = 1
 RANDOM_POLICY = 0
 GREEDY_POLICY = 1
 
+# Random number generator shared by all instances (random guarding policy)
+RANDOM = numpy.random.default_rng()
+
 class Vertex:
   """\
   Vertex base class for the guard-based data structure of Batista (2010).
@@ -55,12 +57,15 @@ class Vertex:
   >>> v = Vertex()
   >>> v.set_point(Point(0.0, 0.0))
   """
+  __slots__ = ('__links', '__guards', '__point', '__status', '__degree')
+
   def __init__(self, point=None, status=ORDINARY_VERTEX):
     """Initializes the Vertex class."""
     self.__links = []
     self.__guards = set()
     self.__point = point
     self.__status = status
+    self.__degree = 0 # number of faces in the link set, kept by guards
 
   # ACCESS methods
 
@@ -84,6 +89,11 @@ class Vertex:
     """Returns the type of the vertex."""
     return self.__status
 
+  @property
+  def degree(self):
+    """Returns the number of faces in the link set."""
+    return self.__degree
+
   # UPDATE methods
 
   def set_point(self, point):
@@ -94,6 +104,10 @@ class Vertex:
     """Set vertex status."""
     self.__status = status
 
+  def set_degree(self, degree):
+    """Set the number of faces in the link set."""
+    self.__degree = degree
+
 class GuardVertices:
   """\
   An implementation of the compact data structure for planar triangulations
@@ -133,6 +147,7 @@ class GuardVertices:
     self.create_vertex() # infinite vertex, index 0
     self.__vertices[0].set_point( Point(numpy.inf,numpy.inf) )
     self.__vertices[0].set_status(GUARD_VERTEX)
+    self.__number_of_guards = 1 # kept by `__guard_face` and `__remove_face_from_guard`
 
   # ACCESS methods
 
@@ -153,23 +168,28 @@ class GuardVertices:
   @property
   def number_of_guards(self): # number of guards
     """Returns the total number of guard-vertices, including the infinite one."""
-    return sum(1 for v in self.vertices if v.status == GUARD_VERTEX)
+    return self.__number_of_guards
   
   @property
   def number_of_ordinaries(self): # number of ordinaries
     """Returns the total number of ordinary vertices."""
-    return sum(1 for v in self.vertices if v.status == ORDINARY_VERTEX)
+    return self.number_of_vertices - self.__number_of_guards
   
   @property
   def number_of_references(self): # number of references
     """Returns the total number of references."""
-    references  = sum(len(sum(v.links, [])) for v in self.vertices if v.status == GUARD_VERTEX)
-    references += sum(len(v.guards) for v in self.vertices if v.status == ORDINARY_VERTEX)
+    # a path with k faces holds k+1 references, so no path has to be walked
+    references = 0
+    for v in self.__vertices:
+      if v.status == GUARD_VERTEX:
+        references += v.degree + len(v.links)
+      else:
+        references += len(v.guards)
     return references
     
   def neighbor(self, i, f):
     """Returns the neighbor face opposite to the i-th vertex of `f`."""
-    return self.__find_up(f[cw(i)], f[ccw(i)])
+    return self.__find_up(f[CW[i]], f[CCW[i]])
 
   def __find_up(self, v0, v1=None):
     """\
@@ -212,9 +232,9 @@ class GuardVertices:
         if v.status == GUARD_VERTEX:
           link = v.links[0]
           return v0, link[0]
-        else: # ORDINARY_VERTEX
-          guard = v.guards[0]
-          return v0, guard[0]
+        else: # ORDINARY_VERTEX, any of its guards is a neighbor
+          guard = next(iter(v.guards))
+          return v0, guard
     else: # error
       warning("Cannot find up undefined vertex.")
       return None
@@ -223,16 +243,14 @@ class GuardVertices:
   def __find_up_guard(self, v0, v1):
     assert self.vertex(v0).status == GUARD_VERTEX
 
-    i1 = p1 = None
-    links = self.vertex(v0).links
+    link = None
     # get the path and index of v1
-    for index, path in enumerate(links):
+    for path in self.__vertices[v0].links:
       if v1 in path:
-        i1 = path.index(v1)
-        p1 = index
+        link = path
         break
 
-    link = links[p1]
+    i1 = link.index(v1)
     last = len(link) - 1
       
     # If link[i1] == link[last], we must have i1 != last indicating a closed link,
@@ -249,18 +267,16 @@ class GuardVertices:
     assert self.vertex(v0).status == ORDINARY_VERTEX
 
     v2 = None
-    guards = self.vertex(v0).guards
-    for vg in guards:
-      i0 = p0 = None
-      links = self.vertex(vg).links
+    vertices = self.__vertices
+    for vg in vertices[v0].guards:
+      link = None
       # get the path and index of v0
-      for index, path in enumerate(links):
+      for path in vertices[vg].links:
         if v0 in path:
-          i0 = path.index(v0)
-          p0 = index
+          link = path
           break
 
-      link = self.vertex(vg).links[p0]
+      i0 = link.index(v0)
 
       if vg == v1:
         # closed paths always have previous vertex
@@ -313,17 +329,21 @@ class GuardVertices:
   def __incident_faces_to_ordinary(self, a):
     """Return all incident faces to ordinary vertex `a`."""
     assert self.vertex(a).status == ORDINARY_VERTEX
-    all_around = [] # all faces incident to neighbor guards
-    for g in self.vertex(a).guards:
-      faces = self.__incident_faces_to_guard(g)
-      all_around.extend(faces)
-
-    # Filter `all_around` that have `a` as a vertex
+    # Faces (g, b, a) and (g, a, c) of each neighbor guard `g` are those around
+    # `a` in the path of `g` holding it, so only that path is inspected.
     incidents = set()
-    for face in all_around:
-      if a in face:
-        i = face.index(a)
-        incidents.add((face[i], face[ccw(i)], face[cw(i)]))
+    vertices = self.__vertices
+    for g in vertices[a].guards:
+      for path in vertices[g].links:
+        if a in path:
+          i = path.index(a)
+          if i > 0:
+            incidents.add((a, g, path[i-1]))
+          elif path[0] == path[-1]: # closed path, `a` at both ends
+            incidents.add((a, g, path[-2]))
+          if i + 1 < len(path):
+            incidents.add((a, path[i+1], g))
+          break
 
     return incidents
 
@@ -352,7 +372,8 @@ class GuardVertices:
     This method implements the `add` operation as described in the page 11,
     fourth paragraph, of Blandford et al. (2005). A triangle `t` can be added
     by finding its vertices and extending each of their link sets.
-    The extension is carried out by the helper method `__insert_face`.
+    The extension is carried out by the helper method `__insert_face_into_guard`
+    for guards, while ordinary vertices only record their guard neighbors.
 
     Parameters
     ----------
@@ -365,21 +386,42 @@ class GuardVertices:
         two and three dimensions. International Journal of Computational
         Geometry & Applications, v. 15, n. 1, p. 3-24, 2005.
     """
-    debug("Inserting face (%d, %d, %d)" % (v0,v1,v2))
+    if DEBUG_ENABLED:
+      debug("Inserting face (%d, %d, %d)", v0, v1, v2)
     # Check if face is guarded.
     # Otherwise, set any of its vertices as guard.
-    status = self.vertex(v0).status | \
-             self.vertex(v1).status | \
-             self.vertex(v2).status
-    
-    if status == UNGUARDED_FACE:
+    vertices = self.__vertices
+    V0 = vertices[v0]
+    V1 = vertices[v1]
+    V2 = vertices[v2]
+    if V0.status | V1.status | V2.status == UNGUARDED_FACE:
       self.__guard_face(v0, v1, v2)
-    else:
+    elif DEBUG_ENABLED:
       debug("Face already GUARDED, so no additional guard is needed.")
 
-    self.__insert_face(v0, v1, v2)
-    self.__insert_face(v1, v2, v0)
-    self.__insert_face(v2, v0, v1)
+    # Statuses are final from here on, so they are read once. Guards extend
+    # their link sets, while ordinary vertices just record guard neighbors.
+    g0 = V0.status == GUARD_VERTEX
+    g1 = V1.status == GUARD_VERTEX
+    g2 = V2.status == GUARD_VERTEX
+
+    if g0:
+      self.__insert_face_into_guard(v0, v1, v2)
+    else:
+      if g1: V0.guards.add(v1)
+      if g2: V0.guards.add(v2)
+
+    if g1:
+      self.__insert_face_into_guard(v1, v2, v0)
+    else:
+      if g2: V1.guards.add(v2)
+      if g0: V1.guards.add(v0)
+
+    if g2:
+      self.__insert_face_into_guard(v2, v0, v1)
+    else:
+      if g0: V2.guards.add(v0)
+      if g1: V2.guards.add(v1)
   
   def __guard_face(self, v0, v1, v2):
     # first, choose a guard
@@ -393,62 +435,42 @@ class GuardVertices:
     # after collecting its incident faces.
     vg.set_status(GUARD_VERTEX)
     vg.guards.clear() # vertex `g` is now a guard, clear its old guard set
+    self.__number_of_guards += 1
 
     # insert incident faces to `g` link set
     for f in faces:
       self.__insert_face_into_guard(f[0], f[1], f[2])
 
     # Now, broadcast the new guard to its ordinary neighbors
-    neighbors = set(sum(vg.links, []))
+    neighbors = set()
+    for path in vg.links:
+      neighbors.update(path)
+    vertices = self.__vertices
     for n in neighbors:
-      vn = self.vertex(n)
+      vn = vertices[n]
       if vn.status == ORDINARY_VERTEX:
         vn.guards.add(g)
 
   def degree(self, v0):
-    k = 0
-    for path in self.vertex(v0).links:
-      k = k + len(path) - 1
-
-    return k
+    """Returns the number of faces in the link set of vertex `v0`."""
+    # kept up to date by `__insert_face_into_guard` and `__remove_face_from_guard`
+    return self.__vertices[v0].degree
 
   def __select_guard(self, v0, v1, v2, policy = GREEDY_POLICY):
     # choose the NEW guard at random
     # TODO: soon, test greedy and other criteria.
     if policy == GREEDY_POLICY:
-      d0 = self.degree(v0)
-      d1 = self.degree(v1)
-      d2 = self.degree(v2)
-      i = numpy.argmax([d0, d1, d2])
-      v = [v0, v1, v2]
-      return v[i]
-
-    return random.choice([v0,v1,v2])
-
-
-  def __insert_face(self, v0, v1, v2):
-    """\
-    Insert in-place face `(v0, v1, v2)` into the link of vertex `v0`.
+      # as numpy.argmax, the first vertex of maximum degree wins ties
+      vertices = self.__vertices
+      d0 = vertices[v0].degree
+      d1 = vertices[v1].degree
+      d2 = vertices[v2].degree
+      if d0 >= d1 and d0 >= d2:
+        return v0
+      return v1 if d1 >= d2 else v2
 
-    This function implements the `extension` operation as described in the
-    page 11, fourth paragraph, of Blandford et al. (2005), as follows:
-       (i) add a new path to the link set, if neither of the two
-           vertices are in the set;
-      (ii) extend an existing path, if one vertex is in the link set;
-     (iii) join two existing paths, if the two vertices are in
-           separate paths;
-      (iv) join a path into a cycle, if the two vertices are the
-           ends of the same path.
+    return (v0, v1, v2)[RANDOM.integers(3)]
 
-    Parameters
-    ----------
-      v0, v1, v2 : int, int, int
-          The face vertices.
-    """
-    if self.vertex(v0).status == ORDINARY_VERTEX:
-      self.__insert_face_into_ordinary(v0,v1,v2)
-    else: # GUARD_VERTEX
-      self.__insert_face_into_guard(v0,v1,v2)
 
   # Here, `v0` MUST be a guard
   def __insert_face_into_guard(self, v0, v1, v2):
@@ -471,15 +493,23 @@ class GuardVertices:
           The face vertices.
     """
     i1 = i2 = p1 = p2 = None
-    links = self.vertex(v0).links
-    # get the path of each neighbor, and its respective index
+    vertex = self.vertex(v0)
+    links = vertex.links
+    # get the path of each neighbor, and its respective index,
+    # stopping as soon as both are found
     for index, path in enumerate(links):
-      if v1 in path:
+      if p1 is None and v1 in path:
         i1 = path.index(v1)
         p1 = index
-      if v2 in path:
+        if p2 is None and path[0] == v2: # closing a cycle, case (iv)
+          i2 = 0
+          p2 = index
+          break
+      if p2 is None and v2 in path:
         i2 = path.index(v2)
         p2 = index
+      if p1 is not None and p2 is not None:
+        break
 
     if p1 is None and p2 is None: # case (i)
       links.append([v1,v2])
@@ -503,36 +533,46 @@ class GuardVertices:
         if i2 == 0 and (i1+1) == len(links[p1]):
           links[p1].append(v2)
         else:
-          warning("Trying to insert face (%d, %d, %d) multiple times." % (v0, v1, v2))
+          warning("Trying to insert face (%d, %d, %d) multiple times.", v0, v1, v2)
           warning("Nothing done.")
+          return
+
+    # each case above adds exactly one face to the link set
+    vertex.set_degree(vertex.degree + 1)
 
-  # Here, `v0` MUST be ordinary
-  def __insert_face_into_ordinary(self, v0, v1, v2):
+  def refill(self, faces, edges):
     """\
-    Insert in-place face `(v0, v1, v2)` into the link of vertex `v0`.
+    Replaces a set of faces by the star of a new vertex.
 
-    This function implements the `extension` operation as described in the
-    page 11, fourth paragraph, of Blandford et al. (2005), as follows:
-       (i) add a new path to the link set, if neither of the two
-           vertices are in the set;
-      (ii) extend an existing path, if one vertex is in the link set;
-     (iii) join two existing paths, if the two vertices are in
-           separate paths;
-      (iv) join a path into a cycle, if the two vertices are the
-           ends of the same path.
+    This is the update step of the Bowyer-Watson algorithm: all `faces` are
+    removed, a new vertex `v` is created and, for each edge `(e0, e1)` on the
+    boundary of the region left by `faces`, face `(v, e0, e1)` is inserted.
+    Guards are kept up to date by `remove_face` and `insert_face`.
 
     Parameters
     ----------
-      v0, v1, v2 : int, int, int
-          The face vertices.
+      faces : list of (int, int, int)
+          The faces to be removed.
+      edges : list of (int, int)
+          The boundary edges of the removed region, in counter-clockwise order.
+
+    Returns
+    -------
+      v : int
+          The index of the new vertex.
     """
-    guards = self.vertex(v0).guards
+    remove_face = self.remove_face
+    for v0, v1, v2 in faces:
+      remove_face(v0, v1, v2)
+
+    self.create_vertex()
+    v = len(self.__vertices) - 1
 
-    if self.vertex(v1).status == GUARD_VERTEX:
-      guards.add(v1)
+    insert_face = self.insert_face
+    for v1, v2 in edges:
+      insert_face(v, v1, v2)
 
-    if self.vertex(v2).status == GUARD_VERTEX:
-      guards.add(v2)
+    return v
 
   def remove_face(self, v0, v1, v2):
     """\
@@ -554,18 +594,22 @@ class GuardVertices:
         two and three dimensions. International Journal of Computational
         Geometry & Applications, v. 15, n. 1, p. 3-24, 2005.
     """
+    # Removing a face from a guard can only demote that guard itself,
+    # so statuses are read once, before any link set changes.
+    vertices = self.__vertices
+    g0 = vertices[v0].status == GUARD_VERTEX
+    g1 = vertices[v1].status == GUARD_VERTEX
+    g2 = vertices[v2].status == GUARD_VERTEX
+
     # First, remove face from guards
-    ordinaries = []
-    f = [v0, v1, v2]
-    for i in range(3):
-      if self.vertex(f[i]).status == GUARD_VERTEX:
-        self.__remove_face_from_guard(f[i], f[ccw(i)], f[cw(i)])
-      else: 
-        ordinaries.append(i)
+    if g0: self.__remove_face_from_guard(v0, v1, v2)
+    if g1: self.__remove_face_from_guard(v1, v2, v0)
+    if g2: self.__remove_face_from_guard(v2, v0, v1)
 
     # Second, update all ordinary guard sets
-    for i in ordinaries:
-      self.__update_guard_set(f[i])
+    if not g0: self.__update_guard_set(v0)
+    if not g1: self.__update_guard_set(v1)
+    if not g2: self.__update_guard_set(v2)
 
   def __remove_face_from_guard(self, v0, v1, v2):
     """\
@@ -580,14 +624,16 @@ class GuardVertices:
           The vertices of the face to be removed.
     """
     i1 = i2 = p1 = p2 = None
-    links = self.vertex(v0).links
+    vertex = self.vertex(v0)
+    links = vertex.links
     for index, path in enumerate(links):
-      if v1 in path:
+      if v1 in path: # both neighbors are in the same path
         i1 = path.index(v1)
         p1 = index
-      if v2 in path:
-        i2 = path.index(v2)
-        p2 = index
+        if v2 in path:
+          i2 = path.index(v2)
+          p2 = index
+        break
 
     # face must exist
     assert (i1 is not None) and (i2 is not None), "Cannot remove missing face."
@@ -613,31 +659,35 @@ class GuardVertices:
       if len(latest) > 1:
         links.insert(p1+1,latest)
 
+    vertex.set_degree(vertex.degree - 1)
+
     # If link set is empty, make it ordinary (except, for the infinite vertex)
     if len(links) == 0:
       if not self.is_infinite(v0):
-        self.vertex(v0).set_status(ORDINARY_VERTEX)
-        self.vertex(v0).links.clear()
+        vertex.set_status(ORDINARY_VERTEX)
+        vertex.links.clear()
+        self.__number_of_guards -= 1
 
   # v0 MUST be ordinary
   def __update_guard_set(self, v0):
     inactive = [] # we must remove any inactive guard
-    for g in self.vertex(v0).guards:
+    vertices = self.__vertices
+    guards = vertices[v0].guards
+    for g in guards:
       # this guard might be inactive, check it out
-      if self.vertex(g).status == GUARD_VERTEX:
-        guarding = False
-        for path in self.vertex(g).links:
+      vg = vertices[g]
+      if vg.status == GUARD_VERTEX:
+        for path in vg.links:
           if v0 in path:
-            guarding = True
             break
-        
-        if not guarding:
+        else: # not guarding
           inactive.append(g)
       else:
         inactive.append(g)
 
     # remove all inactive guards
-    self.vertex(v0).guards.difference_update(set(inactive))
+    if inactive:
+      guards.difference_update(inactive)
 
   # OUTPUT methods
 
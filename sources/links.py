@@ -22,7 +22,7 @@ import numpy
 
 # Import from local packages
 from .geometry import Point
-from .utils import cw, ccw
+from .utils import CW, CCW
 from .log import *
 
 class Vertex:
@@ -42,6 +42,8 @@ class Vertex:
   >>> v = Vertex()
   >>> v.set_point(Point(0.0, 0.0))
   """
+  __slots__ = ('__links', '__point')
+
   def __init__(self, point=None):
     """Initializes the Vertex class."""
     self.__links = []
@@ -123,11 +125,11 @@ class LinkVertices:
   @property
   def number_of_references(self): # number of references
     """Returns the total number of references."""
-    return sum(len(sum(v.links, [])) for v in self.vertices)
+    return sum(len(path) for v in self.__vertices for path in v.links)
   
   def neighbor(self, i, f):
     """Returns the neighbor face opposite to the i-th vertex of `f`."""
-    return self.__find_up(f[cw(i)], f[ccw(i)])
+    return self.__find_up(f[CW[i]], f[CCW[i]])
   
   def __find_up(self, v0, v1=None):
     """\
@@ -290,6 +292,43 @@ class LinkVertices:
         assert i2 == 0 and (i1+1) == len(links[p1])
         links[p1].append(v2)
 
+  def refill(self, faces, edges):
+    """\
+    Replaces a set of faces by the star of a new vertex.
+
+    This is the update step of the Bowyer-Watson algorithm: all `faces` are
+    removed, a new vertex `v` is created and, for each edge `(e0, e1)` on the
+    boundary of the region left by `faces`, face `(v, e0, e1)` is inserted.
+
+    Parameters
+    ----------
+      faces : list of (int, int, int)
+          The faces to be removed.
+      edges : list of (int, int)
+          The boundary edges of the removed region, in counter-clockwise order.
+
+    Returns
+    -------
+      v : int
+          The index of the new vertex.
+    """
+    remove_face = self.__remove_face
+    for v0, v1, v2 in faces:
+      remove_face(v0, v1, v2)
+      remove_face(v1, v2, v0)
+      remove_face(v2, v0, v1)
+
+    self.create_vertex()
+    v = len(self.__vertices) - 1
+
+    insert_face = self.__insert_face
+    for v1, v2 in edges:
+      insert_face(v, v1, v2)
+      insert_face(v1, v2, v)
+      insert_face(v2, v, v1)
+
+    return v
+
   def remove_face(self, v0, v1, v2):
     """\
     Remove in-place face `(v0, v1, v2)` from the triangulation.
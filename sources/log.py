@@ -16,24 +16,32 @@ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
 CC0 1.0 Universal for more details.
 
 Author(s): Vicente Sobrinho <vicente.sobrinho@ufca.edu.br>
+
+Messages may hold `%` placeholders, which are only filled in with the given
+arguments when the message is actually shown. Debug messages are shown
+unless Python runs with `-O` or the environment variable `LOG_DEBUG` is 0.
 """
-def __log(msg):
+import os
+
+DEBUG_ENABLED = __debug__ and os.environ.get("LOG_DEBUG", "1") != "0"
+
+def __log(msg, args):
     """Print message to the standard output stream."""
-    print(msg)
+    print(msg % args if args else msg)
 
-def debug(msg):
+def debug(msg, *args):
     """Show debug message in the standard output stream."""
-    if __debug__:
-        __log("Debug: " + msg)
+    if DEBUG_ENABLED:
+        __log("Debug: " + msg, args)
 
-def info(msg):
+def info(msg, *args):
     """Show info message in the standard output stream."""
-    __log("Info: " + msg)
+    __log("Info: " + msg, args)
 
-def warning(msg):
+def warning(msg, *args):
     """Show warning message in the standard output stream."""
-    __log("Warning: " + msg)
+    __log("Warning: " + msg, args)
 
-def error(msg):
+def error(msg, *args):
     """Show error message in the standard output stream."""
-    __log("Error: " + msg)
\ No newline at end of file
+    __log("Error: " + msg, args)
\ No newline at end of file
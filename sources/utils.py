@@ -17,6 +17,10 @@ CC0 1.0 Universal for more details.
 
 Author(s): Vicente Sobrinho <vicente.sobrinho@ufca.edu.br>
 """
+# cw(i) and ccw(i) for i in (0, 1, 2), to be indexed in hot loops
+CW  = (2, 0, 1)
+CCW = (1, 2, 0)
+
 def cw(i):
   """Returns the next index after `i` in a clockwise (backward) circular permutation."""
   return (i-1)%3
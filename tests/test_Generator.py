@@ -37,8 +37,7 @@ def testGenerator():
   canvas = Canvas(bbox)
 
   canvas.begin()
-  for p in points:
-    canvas.draw_point(p)
+  canvas.draw_points(points)
   canvas.end()
   canvas.close()
 
@@ -50,8 +49,7 @@ def testGenerator():
   canvas = Canvas(bbox)
 
   canvas.begin()
-  for p in points:
-    canvas.draw_point(p)
+  canvas.draw_points(points)
   canvas.end()
   canvas.close()
 
@@ -63,8 +61,7 @@ def testGenerator():
   canvas = Canvas(bbox)
 
   canvas.begin()
-  for p in points:
-    canvas.draw_point(p)
+  canvas.draw_points(points)
   canvas.end()
   canvas.close()
 
@@ -76,8 +73,7 @@ def testGenerator():
   canvas = Canvas(bbox)
 
   canvas.begin()
-  for p in points:
-    canvas.draw_point(p)
+  canvas.draw_points(points)
   canvas.end()
   canvas.close()
 
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""\
+This is file `test_Geometry.py'.
+
+Tests for the geometric constructions and predicates.
+
+Copyright (C) 2024 any individual authors listed elsewhere in this file.
+
+This code is marked with CC0 1.0 Universal. To view a copy of this license, visit
+https://creativecommons.org/publicdomain/zero/1.0/ or the accompanying
+LICENSE file.
+
+It is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+CC0 1.0 Universal for more details.
+
+Author(s): Vicente Sobrinho <vicente.sobrinho@ufca.edu.br>
+"""
+import numpy
+
+from sources.generators import *
+from sources.geometry import Point, circumcircle, circumcircles
+
+def testCircumcircles():
+  # the vectorized construction must agree with the scalar one
+  generate = Generator(1234567890)
+  p = generate.uniform_distribution(1000)
+  q = generate.uniform_distribution(1000)
+  r = generate.uniform_distribution(1000)
+
+  centers, radii = circumcircles(p, q, r)
+  for i in range(len(p)):
+    center, radius = circumcircle(Point(*p[i]), Point(*q[i]), Point(*r[i]))
+    assert numpy.allclose(centers[i], center.coords, rtol=1e-6)
+    assert numpy.isclose(radii[i], abs(radius), rtol=1e-6)
+
+  # collinear triangles have no circumcircle
+  line = numpy.array([[0.0, 0.0], [0.1, 0.1], [0.3, 0.3]])
+  centers, radii = circumcircles(line[0:1], line[1:2], line[2:3])
+  assert numpy.isnan(centers).all()
+  assert numpy.isinf(radii).all()
+
+if __name__ == '__main__':
+  testCircumcircles()
@@ -80,5 +80,45 @@ def testGuardVertices():
   t.print()
   t.statistics()
 
+def testRefill():
+  t = GuardVertices()
+
+  for i in range(9):
+    t.create_vertex()
+
+  # infinite faces
+  t.insert_face(6,0,3)
+  t.insert_face(2,0,6)
+  t.insert_face(4,7,0)
+  t.insert_face(1,4,0)
+  t.insert_face(5,0,2)
+  t.insert_face(0,5,1)
+  t.insert_face(7,3,0)
+
+  # finite faces
+  t.insert_face(1,5,4)
+  t.insert_face(3,8,6)
+  t.insert_face(9,5,2)
+  t.insert_face(4,8,7)
+  t.insert_face(9,2,6)
+  t.insert_face(4,9,8)
+  t.insert_face(5,9,4)
+  t.insert_face(9,6,8)
+  t.insert_face(8,3,7)
+
+  # replace the star of vertex 9 by the star of a new vertex
+  star = [(9,5,2), (9,2,6), (9,6,8), (9,8,4), (9,4,5)]
+  edges = [(5,2), (2,6), (6,8), (8,4), (4,5)]
+  v = t.refill(star, edges)
+
+  assert v == 10
+  assert len(t.incident_faces(9)) == 0
+  assert set(t.incident_faces(v)) == set((v, a, b) for a, b in edges)
+
+  print("AFTER REFILL")
+  t.print()
+  t.statistics()
+
 if __name__ == '__main__':
   testGuardVertices()
+  testRefill()
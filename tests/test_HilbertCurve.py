@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""\
+This is file `test_HilbertCurve.py'.
+
+Tests for the Hilbert curve BRIO.
+
+Copyright (C) 2024 any individual authors listed elsewhere in this file.
+
+This code is marked with CC0 1.0 Universal. To view a copy of this license, visit
+https://creativecommons.org/publicdomain/zero/1.0/ or the accompanying
+LICENSE file.
+
+It is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+CC0 1.0 Universal for more details.
+
+Author(s): Vicente Sobrinho <vicente.sobrinho@ufca.edu.br>
+"""
+import numpy
+
+from sources.generators import *
+from sources.brio.hilbert import HilbertCurve
+from sources.brio import Brio
+from sources.brio import BRIO_HILBERT
+
+def testHilbertCurve():
+  # cells of a 8x8 grid must be visited one step at a time
+  grid = numpy.array([[i, j] for i in range(8) for j in range(8)], dtype=float)
+  curve = HilbertCurve(3)
+  assert sorted(curve.keys(grid)) == list(range(64))
+  steps = numpy.abs(numpy.diff(curve.sort(grid), axis=0)).sum(axis=1)
+  assert (steps == 1.0).all()
+
+  generate = Generator(1234567890)
+  points = generate.uniform_distribution(256)
+
+  brio = Brio(BRIO_HILBERT)
+  brio(points)
+  brio.draw()
+
+if __name__ == '__main__':
+  testHilbertCurve()
@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
 """\
-This is file `test_Generator.py'.
+This is file `test_KdTree.py'.
 
-Tests for the random points generators.
+Tests for the kD-tree used by the BRIO.
 
 Copyright (C) 2024 any individual authors listed elsewhere in this file.
 
@@ -21,6 +21,7 @@ import matplotlib.pyplot as plt
 
 #from sources.canvas import Canvas
 #from sources.geometry import BoundingBox
+from sources.geometry import Point
 from sources.generators import *
 #from sources.brio.kdtree import KdTree, Node
 #from sources.log import *